@@ -20,6 +20,10 @@ setup(
         "uvicorn",
         "httpx",
     ],
+    extras_require={
+        "http2": ["httpx[http2]"],
+        "fast": ["numpy"],
+    },
     entry_points="""
         [console_scripts]
         azure-cost-tracker=src.main:run
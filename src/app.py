@@ -1,20 +1,31 @@
 import os
 import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.responses import HTMLResponse, FileResponse
 from src.main import get_report_data
+from src.services.cost_cube import ReportCubes
 from src.services.report import PdfExporter, ReportMode, ReportRenderer
 from src.services.email_service import send_email_notification
 from src.services.webhook_service import send_webhook_notification
+from src.services.azure_http import close_http_client
 from src.utils.logger import logger
 
-app = FastAPI(title="Azure Cost Tracker Dashboard")
+
+@asynccontextmanager
+async def lifespan(_app):
+    yield
+    await close_http_client()
+
+
+app = FastAPI(title="Azure Cost Tracker Dashboard", lifespan=lifespan)
 
 _renderer = ReportRenderer()
 _pdf_exporter = PdfExporter()
 
-# Thread-safe in-memory cache to avoid slamming APIs
+# Thread-safe in-memory cache to avoid slamming APIs; the cubes belong to _cached_data
 _cached_data = None
+_cached_cubes = None
 _cache_lock = asyncio.Lock()
 _email_task_status = {"last_error": None, "last_success": None}
 
@@ -42,13 +53,21 @@ def send_email_with_pdf_task(subject, data):
                 logger.warning(f"Failed to remove temp PDF {pdf_path}: {cleanup_err}")
 
 
-async def get_cached_report_data(force_refresh=False):
-    global _cached_data
+async def get_cached_report(force_refresh=False):
+    """Return (report data, its ReportCubes), swapped in together once a fetch succeeds."""
+    global _cached_data, _cached_cubes
     async with _cache_lock:
         if _cached_data is None or force_refresh:
             logger.info("Fetching fresh report data...")
-            _cached_data = await get_report_data()
-        return _cached_data
+            cubes = ReportCubes()
+            data = await get_report_data(cubes=cubes)
+            _cached_data, _cached_cubes = data, cubes
+        return _cached_data, _cached_cubes
+
+
+async def get_cached_report_data(force_refresh=False):
+    data, _ = await get_cached_report(force_refresh)
+    return data
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -71,6 +90,21 @@ async def get_costs():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/costs/range")
+async def get_cost_range(start: str, end: str, subscription: str | None = None):
+    """Totals and service breakdown for any date range, read from the report's cost cubes."""
+    try:
+        _, cubes = await get_cached_report()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    try:
+        return cubes.range_summary(start, end, subscription)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown subscription: {subscription}")
+
+
 @app.post("/api/refresh")
 async def refresh_costs():
     try:
@@ -46,12 +46,82 @@ EMAIL_TO = os.getenv("EMAIL_TO")
 # Cost API rate limiting
 COST_API_MAX_CONCURRENT = max(1, _optional_int(os.getenv("COST_API_MAX_CONCURRENT")) or 1)
 COST_API_MIN_INTERVAL_SEC = max(0.0, _optional_float(os.getenv("COST_API_MIN_INTERVAL_SEC"), 0.0))
+# Adaptive token buckets start at COST_API_INITIAL_RATE (or 1 / COST_API_MIN_INTERVAL_SEC)
+# requests per second and tune themselves from Azure quota headers.
+COST_API_MAX_RATE = max(0.01, _optional_float(os.getenv("COST_API_MAX_RATE"), 4.0))
+COST_API_MIN_RATE = min(COST_API_MAX_RATE, max(0.001, _optional_float(os.getenv("COST_API_MIN_RATE"), 0.05)))
+COST_API_INITIAL_RATE = min(
+    COST_API_MAX_RATE,
+    max(
+        COST_API_MIN_RATE,
+        _optional_float(
+            os.getenv("COST_API_INITIAL_RATE"),
+            1.0 / COST_API_MIN_INTERVAL_SEC if COST_API_MIN_INTERVAL_SEC > 0 else 1.0,
+        ),
+    ),
+)
+COST_API_BURST = max(1, _optional_int(os.getenv("COST_API_BURST")) or 2)
+
+# On-disk response cache (last-known-good fallback when Azure throttles or is down)
+COST_CACHE_ENABLED = str_to_bool(os.getenv("COST_CACHE_ENABLED", "true"))
+COST_CACHE_DIR = os.getenv("COST_CACHE_DIR", ".cache/act")
+COST_CACHE_TTL_SEC = max(0.0, _optional_float(os.getenv("COST_CACHE_TTL_SEC"), 3600.0))
+COST_CACHE_METADATA_TTL_SEC = max(0.0, _optional_float(os.getenv("COST_CACHE_METADATA_TTL_SEC"), 86400.0))
+COST_CACHE_SETTLE_DAYS = max(0, _optional_int(os.getenv("COST_CACHE_SETTLE_DAYS")) or 3)
+# Entries not rewritten for this long are pruned (0 keeps them forever)
+COST_CACHE_MAX_AGE_SEC = max(0.0, _optional_float(os.getenv("COST_CACHE_MAX_AGE_SEC"), 30 * 86400.0))
+
+# Fetch closed calendar months with Monthly granularity; only the open period is Daily
+COST_HYBRID_GRANULARITY = str_to_bool(os.getenv("COST_HYBRID_GRANULARITY", "true"))
+
+# Split long Daily actual-cost queries into month chunks fetched concurrently
+COST_QUERY_CHUNKING = str_to_bool(os.getenv("COST_QUERY_CHUNKING", "true"))
+_chunk_retries = _optional_int(os.getenv("COST_QUERY_CHUNK_RETRIES"))
+COST_QUERY_CHUNK_RETRIES = 2 if _chunk_retries is None else max(0, _chunk_retries)
+
+# Run budget: stop waiting on Azure after RUN_DEADLINE_SEC (or --deadline) and give each
+# subscription at most SUBSCRIPTION_TIMEOUT_SEC. With PARTIAL_REPORT, subscriptions that
+# miss the budget or fail are kept in the report and marked as unavailable.
+_run_deadline = _optional_float(os.getenv("RUN_DEADLINE_SEC"), None)
+RUN_DEADLINE_SEC = None if _run_deadline is None else max(0.0, _run_deadline)
+_subscription_timeout = _optional_float(os.getenv("SUBSCRIPTION_TIMEOUT_SEC"), None)
+SUBSCRIPTION_TIMEOUT_SEC = None if _subscription_timeout is None else max(0.0, _subscription_timeout)
+PARTIAL_REPORT = str_to_bool(os.getenv("PARTIAL_REPORT", "false"))
+
+# Parse cost query rows incrementally off the socket instead of response.json()
+COST_STREAM_PARSING = str_to_bool(os.getenv("COST_STREAM_PARSING", "false"))
+COST_STREAM_BATCH_ROWS = max(1, _optional_int(os.getenv("COST_STREAM_BATCH_ROWS")) or 5000)
+# Row batches at least this large are aggregated with NumPy when it is installed
+COST_VECTORIZE_MIN_ROWS = max(1, _optional_int(os.getenv("COST_VECTORIZE_MIN_ROWS")) or 2000)
+
+# Services listed per subscription in the report breakdown; the rest fold into "Other services" (0 lists all)
+_breakdown_top_n = _optional_int(os.getenv("SERVICE_BREAKDOWN_TOP_N"))
+SERVICE_BREAKDOWN_TOP_N = 10 if _breakdown_top_n is None else max(0, _breakdown_top_n)
+
+# Incremental sync: keep settled Daily rows on disk and only re-fetch the trailing window
+COST_INCREMENTAL_SYNC = str_to_bool(os.getenv("COST_INCREMENTAL_SYNC", "false"))
+COST_SYNC_TRAILING_DAYS = max(1, _optional_int(os.getenv("COST_SYNC_TRAILING_DAYS")) or 4)
+COST_SYNC_DIR = os.getenv("COST_SYNC_DIR", os.path.join(COST_CACHE_DIR, "daily"))
+
+# Subscriptions processed in parallel (1 keeps the sequential behaviour)
+SUBSCRIPTION_CONCURRENCY = max(1, _optional_int(os.getenv("SUBSCRIPTION_CONCURRENCY")) or 1)
 BILLING_START_DAY = _optional_int(os.getenv("BILLING_START_DAY"))
 
-# Cost scope: subscription (default) or managementGroup
+# Shared async HTTP client (connection pool for management.azure.com)
+AZURE_HTTP2 = str_to_bool(os.getenv("AZURE_HTTP2", "false"))
+AZURE_HTTP_MAX_CONNECTIONS = max(1, _optional_int(os.getenv("AZURE_HTTP_MAX_CONNECTIONS")) or 10)
+AZURE_HTTP_TIMEOUT_SEC = max(1.0, _optional_float(os.getenv("AZURE_HTTP_TIMEOUT_SEC"), 60.0))
+
+# Cost scope: subscription (default), managementGroup, or auto (planner picks per run)
 COST_SCOPE = os.getenv("COST_SCOPE", "subscription").strip().lower()
+# auto: stats from past runs, and how many times the median row count makes a subscription an outlier
+COST_PLANNER_STATS_PATH = os.getenv("COST_PLANNER_STATS_PATH", os.path.join(COST_CACHE_DIR, "planner_stats.json"))
+COST_AUTO_OUTLIER_FACTOR = max(1.0, _optional_float(os.getenv("COST_AUTO_OUTLIER_FACTOR"), 4.0))
 MANAGEMENT_GROUP_ID = os.getenv("MANAGEMENT_GROUP_ID")
+# Subscriptions per SubscriptionId filter in management-group queries (longer lists are split)
+COST_SCOPE_FILTER_BATCH_SIZE = max(1, _optional_int(os.getenv("COST_SCOPE_FILTER_BATCH_SIZE")) or 50)
 
-# Azure API Endpoints
-AUTH_URL = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/token"
-BASE_URL = "https://management.azure.com"
+# Azure API Endpoints (override to point at the local stand-in server)
+LOGIN_URL = os.getenv("AZURE_LOGIN_URL", "https://login.microsoftonline.com").rstrip("/")
+AUTH_URL = f"{LOGIN_URL}/{TENANT_ID}/oauth2/token"
+BASE_URL = os.getenv("AZURE_MANAGEMENT_URL", "https://management.azure.com").rstrip("/")
@@ -2,14 +2,39 @@ import argparse
 import asyncio
 import os
 import sys
-from src.config import COST_SCOPE, MANAGEMENT_GROUP_ID, NOTIFY_METHOD, SUBSCRIPTIONS
+import time
+from decimal import Decimal
+from src.config import (
+    COST_INCREMENTAL_SYNC,
+    COST_SCOPE,
+    COST_SYNC_TRAILING_DAYS,
+    MANAGEMENT_GROUP_ID,
+    NOTIFY_METHOD,
+    PARTIAL_REPORT,
+    SUBSCRIPTION_CONCURRENCY,
+    SUBSCRIPTIONS,
+)
 from src.services.webhook_service import send_webhook_notification
 from src.services.email_service import send_email_notification
-from src.utils.utils import get_currency_symbol, get_forecast_month_date
+from src.utils.utils import get_currency_symbol, get_forecast_month_date, get_report_run_dates
 from src.services.azure_auth import get_access_token
-from src.services.azure_cost import get_subscription_name, get_cost_data
-from src.services.cost_aggregator import derive_forecast_metrics, derive_metrics_from_daily_rows
+from src.services.azure_cost import (
+    cached_subscription_name,
+    get_subscription_name,
+    get_subscription_names,
+    iter_cost_data,
+    plan_actual_cost_queries,
+)
+from src.services.cost_aggregator import DailyMetricsAccumulator, ForecastMetricsAccumulator
+from src.services.cost_cube import collect_report_cubes, publish_report_cubes
 from src.services.azure_cost_scope import get_management_group_report_entries
+from src.services.azure_http import close_http_client
+from src.services.response_cache import DataStatus, response_cache
+from src.services.cost_sync import iter_incremental_daily_pages
+from src.services.run_budget import RunBudget, parse_deadline
+from src.services.cassette import Cassette, use_cassette
+from src.services.rate_limiter import TENANT_SCOPE, rate_limiter
+from src.services.scope_planner import ScopePlanner, scope_run_stats
 from src.services.report import PdfExporter, ReportMode, ReportRenderer
 from src.services.html_renderer import preview_email
 from src.utils.logger import logger
@@ -18,34 +43,56 @@ _renderer = ReportRenderer()
 _pdf_exporter = PdfExporter()
 
 
+async def _iter_actual_cost_pages(token, dates, subscription_id):
+    """Yield actual-cost pages for each planned segment; incremental sync covers the Daily ones."""
+    for start_date, end_date, granularity in plan_actual_cost_queries(dates):
+        if granularity == "Daily" and COST_INCREMENTAL_SYNC:
+            # Only the segment ending today has unsettled days to re-fetch.
+            trailing_days = COST_SYNC_TRAILING_DAYS if end_date == dates["today"] else 0
+            pages = iter_incremental_daily_pages(
+                token, start_date, end_date, subscription_id, trailing_days=trailing_days
+            )
+        else:
+            pages = iter_cost_data(
+                token, start_date, end_date, subscription_id, query="query", granularity=granularity
+            )
+        async for page in pages:
+            yield page
+
+
 async def process_subscription(subscription_id, token):
     """Process cost calculations and returns data for reporting."""
     try:
+        started = time.monotonic()
         subscription_name = await get_subscription_name(subscription_id, token)
         dates = await get_forecast_month_date(subscription_id, token)
 
-        actual_data = await get_cost_data(
+        data_status = DataStatus()
+        actual = DailyMetricsAccumulator(dates)
+        actual_pages = _iter_actual_cost_pages(token, dates, subscription_id)
+        async for page in actual_pages:
+            actual.add_rows(data_status.observe(page).get("properties", {}).get("rows", []))
+
+        forecast = ForecastMetricsAccumulator(dates)
+        # Actuals before today are already in hand; only the remaining horizon is forecast.
+        async for page in iter_cost_data(
             token,
-            dates["year_starts_on"],
             dates["today"],
-            subscription_id,
-            query="query",
-            granularity="Daily",
-        )
-        forecast_data = await get_cost_data(
-            token,
-            dates["year_starts_on"],
             dates["year_ends_on"],
             subscription_id,
             query="forecast",
             granularity="Daily",
-        )
+        ):
+            forecast.add_rows(data_status.observe(page).get("properties", {}).get("rows", []))
 
-        actual_rows = actual_data.get("properties", {}).get("rows", [])
-        forecast_rows = forecast_data.get("properties", {}).get("rows", [])
-        metrics = derive_metrics_from_daily_rows(actual_rows, dates)
-        forecast_metrics = derive_forecast_metrics(forecast_rows, dates)
+        actual_cube, forecast_cube = actual.cube(), forecast.cube()
+        metrics = actual.result(actual_cube)
+        forecast_metrics = forecast.result(metrics, forecast_cube)
+        publish_report_cubes(subscription_name, actual_cube, forecast_cube)
         currency_symbol = get_currency_symbol(metrics["currency_code"])
+        scope_run_stats.record_subscription(
+            subscription_id, actual.row_count + forecast.row_count, time.monotonic() - started
+        )
 
         return {
             "subscription_name": subscription_name,
@@ -58,47 +105,186 @@ async def process_subscription(subscription_id, token):
             "dates": dates,
             "currency_code": metrics["currency_code"],
             "currency_symbol": currency_symbol,
+            "data_status": data_status.to_dict(),
         }
 
     except Exception as e:
         logger.exception(f"Error processing subscription {subscription_id}: {str(e)}")
 
 
-async def get_report_data():
-    """Fetches all subscription cost reports with consolidated queries and throttling."""
+def unavailable_entry(subscription_id, reason):
+    """Placeholder report entry for a subscription whose data could not be fetched in time."""
+    return {
+        "subscription_name": cached_subscription_name(subscription_id),
+        "daily_cost": Decimal("0.00"),
+        "month_to_day": Decimal("0.00"),
+        "month_forecast": Decimal("0.00"),
+        "year_to_day": Decimal("0.00"),
+        "year_forecast": Decimal("0.00"),
+        "service_breakdown": [],
+        "dates": None,
+        "currency_code": None,
+        "currency_symbol": None,
+        "data_status": DataStatus.unavailable(reason),
+    }
+
+
+def _is_available(entry):
+    return (entry.get("data_status") or {}).get("state") != "unavailable"
+
+
+async def process_subscriptions(subscription_ids, token, concurrency=None, budget=None, partial=False):
+    """
+    Fan out process_subscription with bounded concurrency.
+
+    Results keep the input order; a failing subscription is logged and skipped
+    without cancelling the others. Every request still passes through the
+    shared cost API rate limiter. With a RunBudget each subscription is
+    cancelled once its timeout or the run deadline passes; in partial mode
+    failed and timed-out subscriptions are kept as unavailable entries.
+    """
+    semaphore = asyncio.Semaphore(concurrency or SUBSCRIPTION_CONCURRENCY)
+
+    async def run_one(subscription_id):
+        async with semaphore:
+            timeout = budget.subscription_timeout() if budget else None
+            if timeout is None:
+                return await process_subscription(subscription_id, token)
+            if timeout <= 0:
+                raise asyncio.TimeoutError()
+            return await asyncio.wait_for(process_subscription(subscription_id, token), timeout)
+
+    subscription_ids = [sub_id.strip() for sub_id in subscription_ids]
+    results = await asyncio.gather(
+        *(run_one(sub_id) for sub_id in subscription_ids), return_exceptions=True
+    )
+
+    subscription_data = []
+    failed = []
+    for sub_id, result in zip(subscription_ids, results):
+        if isinstance(result, asyncio.TimeoutError):
+            logger.error(f"Subscription {sub_id} did not finish within the run budget")
+            failed.append(sub_id)
+            if partial:
+                subscription_data.append(unavailable_entry(sub_id, "deadline"))
+        elif isinstance(result, BaseException) or not result:
+            if isinstance(result, BaseException):
+                logger.error(f"Error processing subscription {sub_id}: {result}")
+            failed.append(sub_id)
+            if partial:
+                subscription_data.append(unavailable_entry(sub_id, "error"))
+        else:
+            subscription_data.append(result)
+
+    if failed:
+        logger.warning(
+            f"{len(failed)} of {len(subscription_ids)} subscriptions failed: {', '.join(failed)}"
+        )
+    return subscription_data
+
+
+async def _management_group_entries(token, subscription_ids, budget, partial):
+    timeout = budget.remaining() if budget else None
+    try:
+        return await asyncio.wait_for(get_management_group_report_entries(token, subscription_ids), timeout)
+    except asyncio.TimeoutError:
+        if not partial:
+            raise
+        logger.error("Management group query did not finish within the run budget")
+        return [unavailable_entry(sub_id.strip(), "deadline") for sub_id in subscription_ids], {}
+
+
+async def _subscription_names(token, subscription_ids, budget):
+    """
+    Warm the name cache with one paged listing so each subscription skips its
+    own lookup. The listing counts against the run budget; when it runs out,
+    names already cached are used instead.
+    """
+    timeout = budget.remaining() if budget else None
+    try:
+        return await asyncio.wait_for(get_subscription_names(subscription_ids, token), timeout)
+    except asyncio.TimeoutError:
+        logger.error("Subscription name lookup did not finish within the run budget")
+        return {sub_id: cached_subscription_name(sub_id.strip()) for sub_id in subscription_ids}
+
+
+async def _subscription_entries(token, subscription_ids, budget, partial):
+    await _subscription_names(token, subscription_ids, budget)
+    subscription_data = await process_subscriptions(subscription_ids, token, budget=budget, partial=partial)
+    dates = next((entry["dates"] for entry in subscription_data if entry.get("dates")), {})
+    return subscription_data, dates
+
+
+async def _planned_entries(token, subscription_ids, budget, partial):
+    """COST_SCOPE=auto: let the scope planner split subscriptions between the two strategies."""
+    plan = ScopePlanner(scope_run_stats).plan(subscription_ids)
+    logger.info(f"Scope plan {plan.describe()}")
+    started = time.monotonic()
+
+    subscription_data, dates = [], {}
+    if plan.management_group:
+        subscription_data, dates = await _management_group_entries(token, plan.management_group, budget, partial)
+    if plan.per_subscription:
+        entries, subscription_dates = await _subscription_entries(token, plan.per_subscription, budget, partial)
+        subscription_data += entries
+        dates = dates or subscription_dates
+
+    logger.info(
+        f"Scope plan {plan.name} finished in {time.monotonic() - started:.1f}s "
+        f"(estimated {plan.estimate.seconds:.1f}s)"
+    )
+    scope_run_stats.record_tenant_rate(rate_limiter.known_rate(TENANT_SCOPE))
+    scope_run_stats.save()
+    return subscription_data, dates
+
+
+async def get_report_data(budget=None, partial=None, cubes=None):
+    """
+    Fetches all subscription cost reports with consolidated queries and throttling.
+
+    budget bounds how long Azure is waited on; with partial (default
+    PARTIAL_REPORT) subscriptions that miss it are reported as unavailable
+    instead of being dropped. Pass a ReportCubes as cubes to keep this
+    report's cost cubes for range queries.
+    """
+    partial = PARTIAL_REPORT if partial is None else partial
     token = get_access_token()
+    response_cache.prune()
 
-    if COST_SCOPE == "managementgroup":
-        if not MANAGEMENT_GROUP_ID:
-            raise ValueError("MANAGEMENT_GROUP_ID must be set when COST_SCOPE=managementGroup")
-        subscription_data, dates = await get_management_group_report_entries(token, SUBSCRIPTIONS)
-    else:
-        subscription_data = []
-        for sub_id in SUBSCRIPTIONS:
-            result = await process_subscription(sub_id.strip(), token)
-            if result:
-                subscription_data.append(result)
-        dates = subscription_data[0].get("dates") if subscription_data else {}
+    with collect_report_cubes(cubes):
+        if COST_SCOPE == "managementgroup":
+            if not MANAGEMENT_GROUP_ID:
+                raise ValueError("MANAGEMENT_GROUP_ID must be set when COST_SCOPE=managementGroup")
+            subscription_data, dates = await _management_group_entries(token, SUBSCRIPTIONS, budget, partial)
+        elif COST_SCOPE == "auto":
+            subscription_data, dates = await _planned_entries(token, SUBSCRIPTIONS, budget, partial)
+        else:
+            subscription_data, dates = await _subscription_entries(token, SUBSCRIPTIONS, budget, partial)
 
     subscription_data.sort(key=lambda entry: entry.get("subscription_name", ""))
 
     if not subscription_data:
         raise ValueError("No data available to generate the report.")
 
+    dates = dates or get_report_run_dates()
+    available = [entry for entry in subscription_data if _is_available(entry)]
+    currency_source = available[0] if available else {}
     final_data = {
         "subscriptions": subscription_data,
         "report_for": dates.get("yesterday"),
         "report_generated_on": dates.get("today"),
-        "currency_code": subscription_data[0].get("currency_code", "USD"),
-        "currency_symbol": subscription_data[0].get("currency_symbol", "$"),
+        "currency_code": currency_source.get("currency_code") or "USD",
+        "currency_symbol": currency_source.get("currency_symbol") or "$",
     }
     return final_data
 
 
-async def main(preview=False):
+async def main(preview=False, deadline=None, partial=None, cassette=None):
     pdf_path = None
     try:
-        final_data = await get_report_data()
+        budget = RunBudget() if deadline is None else RunBudget(deadline_sec=deadline)
+        with use_cassette(cassette):
+            final_data = await get_report_data(budget=budget, partial=partial)
         report_html = _renderer.render(final_data, mode=ReportMode.STATIC)
 
         if preview:
@@ -121,6 +307,7 @@ async def main(preview=False):
         logger.exception(f"Error in main execution: {e}")
         sys.exit(1)
     finally:
+        await close_http_client()
         if pdf_path and os.path.exists(pdf_path):
             try:
                 os.remove(pdf_path)
@@ -132,6 +319,26 @@ def run():
     parser = argparse.ArgumentParser(description="Azure Cost Tracker Utility")
     parser.add_argument("--server", action="store_true", help="Start the FastAPI interactive dashboard server")
     parser.add_argument("--preview", action="store_true", help="Generate report, write locally, and open in browser")
+    parser.add_argument(
+        "--deadline",
+        type=parse_deadline,
+        help="Stop waiting on Azure after this many seconds, or at a local time such as 07:45",
+    )
+    parser.add_argument(
+        "--partial",
+        action="store_true",
+        default=None,
+        help="Send the report even if some subscriptions fail or miss the deadline",
+    )
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument("--record", metavar="FILE", help="Record every Azure response to a compressed cassette")
+    cassette_group.add_argument("--replay", metavar="FILE", help="Serve Azure responses from a recorded cassette (offline)")
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.0,
+        help="Replay speed relative to the recorded latencies (0 = no delay)",
+    )
     args = parser.parse_args()
 
     if args.server:
@@ -139,7 +346,14 @@ def run():
         logger.info("Starting FastAPI interactive dashboard server...")
         uvicorn.run("src.app:app", host="0.0.0.0", port=8000, reload=True)
     else:
-        asyncio.run(main(preview=args.preview))
+        cassette = None
+        if args.record:
+            cassette = Cassette.for_recording(args.record)
+        elif args.replay:
+            cassette = Cassette.load(args.replay, speed=args.replay_speed)
+        asyncio.run(
+            main(preview=args.preview, deadline=args.deadline, partial=args.partial, cassette=cassette)
+        )
 
 
 if __name__ == "__main__":
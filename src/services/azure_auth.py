@@ -4,6 +4,7 @@ from src.utils.logger import logger
 import requests, os
 from cryptography.fernet import Fernet
 from src.config import CLIENT_ID, CLIENT_SECRET, BASE_URL, AUTH_URL, MOCK_AZURE
+from src.services import cassette as azure_cassette
 
 TOKEN_FILE = "token.enc"
 KEY_FILE = "secret.key"
@@ -14,6 +15,10 @@ def get_access_token():
         logger.info("Using Mock Azure Authentication.")
         return "mock-access-token-12345"
 
+    if azure_cassette.active_cassette is not None and azure_cassette.active_cassette.replaying:
+        logger.info("Replaying recorded Azure responses; no token needed.")
+        return "replay-access-token"
+
     token = decrypt_token()
 
     if token and not is_token_expired(token['expires_on']):
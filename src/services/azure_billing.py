@@ -1,25 +1,27 @@
 import time
-import requests
-from datetime import datetime
 
 from src.config import BASE_URL, BILLING_START_DAY, MOCK_AZURE
+from src.services import cassette as azure_cassette
+from src.services.azure_http import get_http_client
+from src.services.single_flight import azure_single_flight, request_key
+from src.utils import clock
 from src.utils.logger import logger
 
 _billing_period_cache = {}
 _BILLING_CACHE_TTL_SEC = 24 * 60 * 60
 
 
-def get_billing_period(subscription_id, access_token=None):
+async def get_billing_period(subscription_id, access_token=None):
     """Fetch billing period start/end for a subscription, with in-memory cache."""
     if BILLING_START_DAY is not None:
-        today = datetime.now()
+        today = clock.now()
         start_date = today.replace(day=BILLING_START_DAY).strftime("%Y-%m-%d")
         end_date = (today.replace(day=28) + __import__("datetime").timedelta(days=4)).replace(day=1)
         end_date = (end_date - __import__("datetime").timedelta(days=1)).strftime("%Y-%m-%d")
         return start_date, end_date
 
     if MOCK_AZURE:
-        today = datetime.now()
+        today = clock.now()
         start_date = f"{today.year}-{today.month:02d}-01"
         end_date = f"{today.year}-{today.month:02d}-28"
         return start_date, end_date
@@ -36,14 +38,35 @@ def get_billing_period(subscription_id, access_token=None):
         f"{BASE_URL}/subscriptions/{subscription_id}/providers/Microsoft.Billing/"
         f"billingPeriods?api-version=2018-03-01-preview"
     )
+    return await azure_single_flight.do(
+        request_key(url),
+        lambda: _fetch_billing_period(url, subscription_id, access_token),
+    )
+
+
+async def _get_billing_periods(url, headers):
+    """GET the billing periods as (status, JSON body or text), through the active cassette if any."""
+    cassette = azure_cassette.active_cassette
+    if cassette is not None and cassette.replaying:
+        return await cassette.replay("billing", url)
+
+    started = time.monotonic()
+    response = await get_http_client().get(url, headers=headers)
+    body = response.json() if response.status_code == 200 else response.text
+    if cassette is not None:
+        cassette.record("billing", url, None, time.monotonic() - started, response.status_code, body)
+    return response.status_code, body
+
+
+async def _fetch_billing_period(url, subscription_id, access_token):
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json",
     }
 
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        periods = response.json().get("value", [])
+    status_code, body = await _get_billing_periods(url, headers)
+    if status_code == 200:
+        periods = body.get("value", [])
         if periods:
             latest = periods[0]
             start_date = latest["properties"]["billingPeriodStartDate"]
@@ -60,7 +83,7 @@ def get_billing_period(subscription_id, access_token=None):
     else:
         logger.warning(
             f"Billing period request failed for subscription {subscription_id}: "
-            f"{response.status_code}, {response.text}"
+            f"{status_code}, {body}"
         )
 
     return None, None
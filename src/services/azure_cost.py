@@ -1,24 +1,69 @@
-import os
 import random
 import time
 import asyncio
-import requests
+import weakref
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 
+import httpx
+
 from src.utils.logger import logger
 from src.config import (
     BASE_URL,
     COST_API_MAX_CONCURRENT,
-    COST_API_MIN_INTERVAL_SEC,
+    COST_QUERY_CHUNK_RETRIES,
+    COST_HYBRID_GRANULARITY,
+    COST_QUERY_CHUNKING,
+    COST_STREAM_BATCH_ROWS,
+    COST_STREAM_PARSING,
     MOCK_AZURE,
 )
+from src.services import cassette as azure_cassette
+from src.services.azure_http import get_http_client
+from src.services.cost_stream_parser import CostRowStreamParser
+from src.services.rate_limiter import rate_limiter, retry_after_seconds, scopes_for_request
+from src.services.single_flight import azure_single_flight, request_key
+from src.services.response_cache import (
+    cache_key,
+    request_fingerprint,
+    response_cache,
+    ttl_for_request,
+)
+
+_loop_semaphores = weakref.WeakKeyDictionary()
+_CHUNK_RETRY_BACKOFF_SEC = 2.0
+_CHUNK_DONE = object()
+_subscription_names = {}
+
+
+def _get_semaphore():
+    """Return the concurrency semaphore for the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _loop_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(COST_API_MAX_CONCURRENT)
+        _loop_semaphores[loop] = semaphore
+    return semaphore
+
+
+@asynccontextmanager
+async def _cost_api_slot(scopes):
+    """Take a rate-limit token, then hold one concurrency permit for a single HTTP attempt."""
+    await rate_limiter.acquire(scopes)
+    async with _get_semaphore():
+        yield
+
 
-_cost_api_semaphore = asyncio.Semaphore(COST_API_MAX_CONCURRENT)
-_last_cost_api_request_at = 0.0
-_rate_limit_lock = asyncio.Lock()
+class AzureThrottled(RuntimeError):
+    """Raised when a request is still answered with 429 after every retry."""
 
 
-def fetch_azure_data(
+def _retry_delay(response, retry_count, backoff_factor):
+    retry_after = retry_after_seconds(response.headers)
+    return max(retry_after, backoff_factor ** retry_count) + random.uniform(0, 3)
+
+
+async def send_azure_request(
     url,
     token,
     payload=None,
@@ -26,65 +71,147 @@ def fetch_azure_data(
     backoff_factor=2,
     subscription_id=None,
     query_type="query",
+    stream=False,
 ):
+    """
+    Send a throttled Azure API request, retrying 429 responses, and return
+    the successful httpx response.
+
+    The concurrency permit is held only while a request is on the wire; during
+    backoff it is released so other queries keep flowing, and the request is
+    re-queued once its retry deadline has passed. With stream=True the body is
+    left unread and the caller must close the response.
+    """
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
     context = f"subscription={subscription_id or 'n/a'} query={query_type}"
+    client = get_http_client()
+    scopes = scopes_for_request(url, payload)
+    retry_at = 0.0
+    attempt_timings = []
 
-    try:
-        retry_count = 0
-        while retry_count < max_retries:
-            response = (
-                requests.post(url, headers=headers, json=payload)
-                if payload
-                else requests.get(url, headers=headers)
+    for attempt in range(1, max_retries + 1):
+        delay = retry_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        request = (
+            client.build_request("POST", url, headers=headers, json=payload)
+            if payload
+            else client.build_request("GET", url, headers=headers)
+        )
+        queued_at = time.monotonic()
+        async with _cost_api_slot(scopes):
+            sent_at = time.monotonic()
+            try:
+                response = await client.send(request, stream=stream)
+            except Exception as e:
+                logger.error(f"Request failed on attempt {attempt} [{context}]: {e}")
+                raise
+            finished_at = time.monotonic()
+            rate_limiter.observe(scopes, response.status_code, response.headers)
+
+        attempt_timings.append(finished_at - sent_at)
+        logger.info(
+            f"Attempt {attempt}/{max_retries} [{context}] -> {response.status_code} "
+            f"in {(finished_at - sent_at) * 1000:.0f} ms "
+            f"(queued {(sent_at - queued_at) * 1000:.0f} ms)"
+        )
+
+        if response.status_code < 400:
+            return response
+
+        if stream:
+            await response.aread()
+            await response.aclose()
+
+        if response.status_code == 429:
+            wait_time = _retry_delay(response, attempt - 1, backoff_factor)
+            retry_at = time.monotonic() + wait_time
+            logger.warning(
+                f"Rate limit exceeded (429) [{context}]. Retrying in {wait_time:.1f} seconds..."
             )
+            continue
 
-            if response.status_code < 400:
-                return response.json()
-
-            if response.status_code == 429:
-                retry_after = int(
-                    response.headers.get(
-                        "x-ms-ratelimit-microsoft.costmanagement-entity-retry-after", 2
-                    )
-                )
-                wait_time = max(retry_after, backoff_factor ** retry_count) + random.uniform(0, 3)
-                logger.warning(
-                    f"Rate limit exceeded (429) [{context}]. Retrying in {wait_time:.1f} seconds..."
-                )
-                time.sleep(wait_time)
-                retry_count += 1
-                continue
-
-            logger.error(f"Error {response.status_code} [{context}]: {response.text}")
-            response.raise_for_status()
+        logger.error(f"Error {response.status_code} [{context}]: {response.text}")
+        response.raise_for_status()
+
+    timings = ", ".join(f"{t * 1000:.0f} ms" for t in attempt_timings)
+    logger.error(f"Failed after {max_retries} attempts [{context}]: attempt timings {timings}")
+    raise AzureThrottled(f"Azure API still throttled after {max_retries} attempts [{context}]")
+
+
+async def fetch_azure_data(
+    url,
+    token,
+    payload=None,
+    max_retries=8,
+    backoff_factor=2,
+    subscription_id=None,
+    query_type="query",
+):
+    """Send a throttled Azure API request and return the decoded JSON body."""
+    cassette = azure_cassette.active_cassette
+    if cassette is not None and cassette.replaying:
+        _, body = await cassette.replay("azure", url, payload)
+        return body
+
+    started = time.monotonic()
+    try:
+        response = await send_azure_request(
+            url,
+            token,
+            payload,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            subscription_id=subscription_id,
+            query_type=query_type,
+        )
+        body = response.json()
     except Exception as e:
-        logger.error(f"Failed after {max_retries} attempts [{context}]: {e}")
-        raise e
+        if cassette is not None:
+            cassette.record("azure", url, payload, time.monotonic() - started, status=None, error=str(e))
+        raise
+
+    if cassette is not None:
+        cassette.record("azure", url, payload, time.monotonic() - started, response.status_code, body)
+    return body
 
 
 async def _throttled_cost_api_call(url, token, payload, subscription_id, query_type):
-    global _last_cost_api_request_at
-
-    async with _cost_api_semaphore:
-        async with _rate_limit_lock:
-            if COST_API_MIN_INTERVAL_SEC > 0:
-                elapsed = time.monotonic() - _last_cost_api_request_at
-                if elapsed < COST_API_MIN_INTERVAL_SEC:
-                    await asyncio.sleep(COST_API_MIN_INTERVAL_SEC - elapsed)
-            _last_cost_api_request_at = time.monotonic()
-
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            None,
-            lambda: fetch_azure_data(
-                url,
-                token,
-                payload,
-                subscription_id=subscription_id,
-                query_type=query_type,
-            ),
+    key = cache_key(url, payload)
+    request = request_fingerprint(url, payload)
+    cached = response_cache.get(key)
+    if cached and response_cache.is_fresh(cached, request):
+        return cached["response"]
+
+    try:
+        response = await _coalesced_api_call(url, token, payload, subscription_id, query_type)
+    except Exception as e:
+        if cached is None:
+            raise
+        logger.warning(
+            f"Serving last known good response [subscription={subscription_id or 'n/a'} "
+            f"query={query_type}] after failure: {e}"
         )
+        return response_cache.stale_response(cached)
+
+    response_cache.put(key, response, ttl_for_request(query_type, payload), request)
+    return response
+
+
+async def _coalesced_api_call(url, token, payload, subscription_id, query_type):
+    # Identical concurrent requests (e.g. dashboard refresh racing a notify call)
+    # share one in-flight call instead of each spending quota.
+    return await azure_single_flight.do(
+        request_key(url, payload),
+        lambda: fetch_azure_data(
+            url,
+            token,
+            payload,
+            subscription_id=subscription_id,
+            query_type=query_type,
+        ),
+    )
 
 
 def _mock_daily_rows(start_date, end_date, scale, is_forecast=False):
@@ -114,11 +241,29 @@ def _mock_daily_rows(start_date, end_date, scale, is_forecast=False):
     return rows
 
 
+def _mock_monthly_rows(daily_rows):
+    """Roll mock Daily rows up to calendar months, keyed like Azure's BillingMonth column."""
+    totals = {}
+    for row in daily_rows:
+        billing_month = f"{row[1][:4]}-{row[1][4:6]}-01T00:00:00"
+        key = (billing_month, *row[2:])
+        totals[key] = totals.get(key, 0.0) + row[0]
+    return [[round(cost, 6), key[0], *key[1:]] for key, cost in totals.items()]
+
+
 # Fetching Azure Subscription Name
+def _mock_subscription_name(subscription_id):
+    sub_type = "Prod" if "prod" in subscription_id.lower() or "production" in subscription_id.lower() else "Dev"
+    return f"{sub_type} Subscription ({subscription_id[-8:] if len(subscription_id) > 8 else subscription_id})"
+
+
 async def get_subscription_name(subscription_id, token):
     if MOCK_AZURE:
-        sub_type = "Prod" if "prod" in subscription_id.lower() or "production" in subscription_id.lower() else "Dev"
-        return f"{sub_type} Subscription ({subscription_id[-8:] if len(subscription_id) > 8 else subscription_id})"
+        return _mock_subscription_name(subscription_id)
+
+    cached = _subscription_names.get(subscription_id.lower())
+    if cached:
+        return cached
 
     url = f"{BASE_URL}/subscriptions/{subscription_id}/?api-version=2020-01-01"
     try:
@@ -128,45 +273,176 @@ async def get_subscription_name(subscription_id, token):
         return f"Subscription {subscription_id}"
 
 
-# Fetching Cost
-async def get_cost_data(
-    access_token,
-    start_date,
-    end_date,
+def cached_subscription_name(subscription_id):
+    """Return an already resolved display name without calling Azure."""
+    if MOCK_AZURE:
+        return _mock_subscription_name(subscription_id)
+    return _subscription_names.get(subscription_id.lower(), f"Subscription {subscription_id}")
+
+
+async def get_subscription_names(subscription_ids, token):
+    """
+    Resolve display names for many subscriptions with one paged GET /subscriptions
+    listing (persisted by the response cache). Subscriptions missing from the
+    listing fall back to individual lookups.
+    """
+    if MOCK_AZURE:
+        return {sub_id: _mock_subscription_name(sub_id) for sub_id in subscription_ids}
+
+    wanted = {sub_id.strip().lower() for sub_id in subscription_ids}
+    found = set()
+    url = f"{BASE_URL}/subscriptions?api-version=2020-01-01"
+    try:
+        while url and not wanted.issubset(found):
+            data = await _throttled_cost_api_call(url, token, None, None, "metadata")
+            for item in data.get("value", []):
+                sub_key = str(item.get("subscriptionId", "")).lower()
+                if sub_key in wanted and item.get("displayName"):
+                    _subscription_names[sub_key] = item["displayName"]
+                    found.add(sub_key)
+            url = data.get("nextLink")
+    except Exception as e:
+        logger.warning(f"Subscription listing failed; falling back to per-subscription lookups: {e}")
+
+    names = await asyncio.gather(
+        *(get_subscription_name(sub_id, token) for sub_id in subscription_ids)
+    )
+    return dict(zip(subscription_ids, names))
+
+
+async def iter_cost_pages(url, token, payload, subscription_id, query_type):
+    """
+    Yield each Cost Management result page as it arrives, following
+    properties.nextLink until the result set is exhausted.
+
+    Continuation requests re-send the original query body to the nextLink URL.
+    With COST_STREAM_PARSING enabled, rows are parsed off the socket and
+    yielded in batches instead (bypassing the response cache and request
+    coalescing, which both need the whole body). Cassette runs always use the
+    buffered path so every page is recorded.
+    """
+    if COST_STREAM_PARSING and azure_cassette.active_cassette is None:
+        async for page in iter_streamed_cost_pages(url, token, payload, subscription_id, query_type):
+            yield page
+        return
+
+    next_url = url
+    page_count = 0
+    while next_url:
+        page = await _throttled_cost_api_call(next_url, token, payload, subscription_id, query_type)
+        page_count += 1
+        yield page
+        next_url = (page or {}).get("properties", {}).get("nextLink")
+    if page_count > 1:
+        logger.info(f"Fetched {page_count} result pages [subscription={subscription_id} query={query_type}]")
+
+
+async def iter_streamed_cost_pages(
+    url,
+    token,
+    payload,
     subscription_id,
-    query="query",
-    granularity="Monthly",
+    query_type,
+    batch_rows=COST_STREAM_BATCH_ROWS,
 ):
-    if MOCK_AZURE:
-        scale = 1.8 if "prod" in subscription_id.lower() or "production" in subscription_id.lower() else 0.5
-        is_forecast = query == "forecast"
-        if granularity == "Daily":
-            rows = _mock_daily_rows(start_date, end_date, scale, is_forecast=is_forecast)
-        else:
-            usage_month = datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y%m")
-            time_factor = 8.5 if "01-01" in start_date else 1.0
-            multiplier = (1.2 if is_forecast else 1.0) * time_factor
-            rows = [
-                [2850.30 * scale * multiplier, usage_month, "Virtual Machines", "CAD"],
-                [980.45 * scale * multiplier, usage_month, "Azure SQL Database", "CAD"],
-                [640.20 * scale * multiplier, usage_month, "Storage Accounts", "CAD"],
-                [95.40 * scale * multiplier, usage_month, "Key Vault", "CAD"],
-                [380.50 * scale * multiplier, usage_month, "Cognitive Services", "CAD"],
-                [185.30 * scale * multiplier, usage_month, "Bandwidth", "CAD"],
-            ]
-
-        return {
-            "properties": {
-                "columns": [
-                    {"name": "Cost", "type": "Number"},
-                    {"name": "UsageDate", "type": "String"},
-                    {"name": "ServiceName", "type": "String"},
-                    {"name": "Currency", "type": "String"},
-                ],
-                "rows": rows,
-            }
+    """Yield row batches parsed incrementally from streamed response bodies."""
+    next_url = url
+    while next_url:
+        response = await send_azure_request(
+            next_url,
+            token,
+            payload,
+            subscription_id=subscription_id,
+            query_type=query_type,
+            stream=True,
+        )
+        parser = CostRowStreamParser()
+        batch = []
+        try:
+            async for text in response.aiter_text():
+                batch.extend(parser.feed(text))
+                # Rows can only be interpreted once the columns are known.
+                if len(batch) >= batch_rows and parser.columns is not None:
+                    yield {"properties": {"columns": parser.columns, "rows": batch}}
+                    batch = []
+        finally:
+            await response.aclose()
+
+        properties = parser.close().get("properties", {})
+        if batch or parser.columns is None:
+            yield {"properties": {"columns": parser.columns or [], "rows": batch}}
+        next_url = properties.get("nextLink")
+
+
+def _mock_cost_response(start_date, end_date, subscription_id, query, granularity):
+    scale = 1.8 if "prod" in subscription_id.lower() or "production" in subscription_id.lower() else 0.5
+    is_forecast = query == "forecast"
+    rows = _mock_daily_rows(start_date, end_date, scale, is_forecast=is_forecast)
+    if granularity == "Monthly":
+        rows = _mock_monthly_rows(rows)
+
+    return {
+        "properties": {
+            "columns": [
+                {"name": "Cost", "type": "Number"},
+                {"name": "UsageDate", "type": "String"},
+                {"name": "ServiceName", "type": "String"},
+                {"name": "Currency", "type": "String"},
+            ],
+            "rows": rows,
         }
+    }
 
+
+# Fetching Cost
+def month_chunks(start_date, end_date):
+    """Split an inclusive YYYY-MM-DD range into calendar-month sized (from, to) ranges."""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    chunks = []
+    while start <= end:
+        next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        chunk_end = min(end, next_month - timedelta(days=1))
+        chunks.append((start.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d")))
+        start = next_month
+    return chunks
+
+
+def plan_actual_cost_queries(dates):
+    """
+    Plan the actual-cost queries behind one report as (from, to, granularity) segments.
+
+    YTD only needs monthly totals for calendar months that closed before the
+    open period (the current billing month and yesterday), so those are
+    fetched with Monthly granularity; everything else stays Daily. Monthly
+    rows are dated on the first of their month, which falls inside the YTD
+    range and outside the MTD/daily ranges, so both kinds feed
+    DailyMetricsAccumulator unchanged.
+    """
+    if not COST_HYBRID_GRANULARITY:
+        return [(dates["year_starts_on"], dates["today"], "Daily")]
+
+    year_start = datetime.strptime(dates["year_starts_on"], "%Y-%m-%d")
+    open_from = min(
+        datetime.strptime(dates["month_starts_on"], "%Y-%m-%d"),
+        datetime.strptime(dates["yesterday"], "%Y-%m-%d"),
+    )
+    first_month = year_start if year_start.day == 1 else (year_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    last_month_end = open_from.replace(day=1) - timedelta(days=1)
+    if first_month > last_month_end:
+        return [(dates["year_starts_on"], dates["today"], "Daily")]
+
+    segments = []
+    if year_start < first_month:
+        segments.append(
+            (dates["year_starts_on"], (first_month - timedelta(days=1)).strftime("%Y-%m-%d"), "Daily")
+        )
+    segments.append((first_month.strftime("%Y-%m-%d"), last_month_end.strftime("%Y-%m-%d"), "Monthly"))
+    segments.append(((last_month_end + timedelta(days=1)).strftime("%Y-%m-%d"), dates["today"], "Daily"))
+    return segments
+
+
+def _cost_query_request(start_date, end_date, subscription_id, query, granularity):
     url = f"{BASE_URL}/subscriptions/{subscription_id}/providers/Microsoft.CostManagement/{query}?api-version=2021-10-01"
 
     payload = {
@@ -182,7 +458,113 @@ async def get_cost_data(
     }
 
     if query == "forecast":
-        payload["includeActualCost"] = True
-        payload["includeFreshPartialCost"] = True
+        # Forecasts start today; actuals come from the actual-cost query.
+        payload["includeActualCost"] = False
+        payload["includeFreshPartialCost"] = False
+
+    return url, payload
+
+
+def _is_transient(error):
+    """Transport failures, throttling and server errors are worth another attempt."""
+    if isinstance(error, (httpx.TransportError, AzureThrottled)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return False
+
+
+async def _fetch_chunk(access_token, start_date, end_date, subscription_id, query, granularity):
+    """
+    Yield one chunk's pages as they arrive.
+
+    A transient failure restarts the chunk as long as none of its pages has
+    been yielded yet; other errors, and failures after the first page,
+    propagate.
+    """
+    url, payload = _cost_query_request(start_date, end_date, subscription_id, query, granularity)
+    for attempt in range(1, COST_QUERY_CHUNK_RETRIES + 2):
+        yielded = False
+        try:
+            async for page in iter_cost_pages(url, access_token, payload, subscription_id, query):
+                yielded = True
+                yield page
+            return
+        except Exception as e:
+            if yielded or attempt > COST_QUERY_CHUNK_RETRIES or not _is_transient(e):
+                raise
+            logger.warning(
+                f"Chunk {start_date}..{end_date} failed [subscription={subscription_id} "
+                f"query={query}] (attempt {attempt}): {e}. Retrying chunk."
+            )
+            await asyncio.sleep(_CHUNK_RETRY_BACKOFF_SEC * attempt)
+
+
+async def _pump_chunk(pages, queue):
+    """Hand a chunk's pages to the consumer one at a time, then the end marker (or the error)."""
+    try:
+        async for page in pages:
+            await queue.put(page)
+    except Exception as e:
+        await queue.put(e)
+    else:
+        await queue.put(_CHUNK_DONE)
+
+
+async def _iter_chunked_cost_data(access_token, chunks, subscription_id, query, granularity):
+    """
+    Run month chunks concurrently through the limiter and yield their pages in
+    date order. Each chunk buffers at most one page ahead of the consumer.
+    """
+    queues = [asyncio.Queue(maxsize=1) for _ in chunks]
+    tasks = [
+        asyncio.create_task(
+            _pump_chunk(
+                _fetch_chunk(access_token, chunk_start, chunk_end, subscription_id, query, granularity),
+                queue,
+            )
+        )
+        for (chunk_start, chunk_end), queue in zip(chunks, queues)
+    ]
+    try:
+        for queue in queues:
+            while (page := await queue.get()) is not _CHUNK_DONE:
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# Fetching Cost
+async def iter_cost_data(
+    access_token,
+    start_date,
+    end_date,
+    subscription_id,
+    query="query",
+    granularity="Monthly",
+):
+    """
+    Yield cost query result pages for a subscription as they arrive.
+
+    Long Daily actual-cost ranges are split into month chunks that run
+    concurrently; pages are still yielded in date order.
+    """
+    if MOCK_AZURE:
+        yield _mock_cost_response(start_date, end_date, subscription_id, query, granularity)
+        return
+
+    chunks = month_chunks(start_date, end_date)
+    if COST_QUERY_CHUNKING and query == "query" and granularity == "Daily" and len(chunks) > 1:
+        async for page in _iter_chunked_cost_data(
+            access_token, chunks, subscription_id, query, granularity
+        ):
+            yield page
+        return
+
+    url, payload = _cost_query_request(start_date, end_date, subscription_id, query, granularity)
+    async for page in iter_cost_pages(url, access_token, payload, subscription_id, query):
+        yield page
 
-    return await _throttled_cost_api_call(url, access_token, payload, subscription_id, query)
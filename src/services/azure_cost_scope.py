@@ -1,39 +1,74 @@
-from collections import defaultdict
-
-from src.config import BASE_URL, MANAGEMENT_GROUP_ID, MOCK_AZURE
-from src.services.azure_cost import _mock_daily_rows, _throttled_cost_api_call
-from src.services.cost_aggregator import derive_forecast_metrics, derive_metrics_from_daily_rows
-from src.services.azure_cost import get_subscription_name
+import time
+
+from src.config import BASE_URL, COST_SCOPE_FILTER_BATCH_SIZE, MANAGEMENT_GROUP_ID, MOCK_AZURE
+from src.services.azure_cost import (
+    _mock_daily_rows,
+    _mock_monthly_rows,
+    _throttled_cost_api_call,
+    iter_cost_pages,
+    plan_actual_cost_queries,
+)
+from src.services.cost_aggregator import DailyMetricsAccumulator, ForecastMetricsAccumulator
+from src.services.cost_columns import CodeBook, partition_page
+from src.services.azure_cost import get_subscription_names
+from src.services.cost_cube import publish_report_cubes
+from src.services.response_cache import DataStatus
+from src.services.scope_planner import scope_run_stats
+from src.utils.logger import logger
 from src.utils.utils import get_currency_symbol, get_forecast_month_date
 
 
-def _group_rows_by_subscription(cost_data):
-    rows = cost_data.get("properties", {}).get("rows", [])
-    columns = [col.get("name") for col in cost_data.get("properties", {}).get("columns", [])]
+def subscription_filter_batches(subscription_ids, batch_size=None):
+    """Split configured subscriptions into lists small enough for one dataset.filter."""
+    batch_size = batch_size or COST_SCOPE_FILTER_BATCH_SIZE
+    ids = list(dict.fromkeys(sub_id.strip() for sub_id in subscription_ids if sub_id.strip()))
+    return [ids[index:index + batch_size] for index in range(0, len(ids), batch_size)]
+
 
-    grouped = defaultdict(list)
-    for row in rows:
-        row_map = dict(zip(columns, row)) if columns else {}
-        subscription_id = row_map.get("SubscriptionId") or row_map.get("SubscriptionName")
-        if not subscription_id:
-            continue
+def _scope_query_request(start_date, end_date, query, granularity, subscription_ids=None):
+    url = f"{BASE_URL}/providers/Microsoft.CostManagement/{query}?api-version=2021-10-01"
+    payload = {
+        "type": "ActualCost",
+        "timeframe": "Custom",
+        "timePeriod": {"from": start_date, "to": end_date},
+        "dataset": {
+            "granularity": granularity,
+            "aggregation": {"totalCost": {"name": "Cost", "function": "Sum"}},
+            "grouping": [
+                {"type": "Dimension", "name": "SubscriptionId"},
+                {"type": "Dimension", "name": "ServiceName"},
+            ],
+            "sorting": [{"direction": "ascending", "name": "UsageDate"}],
+        },
+        "scope": f"/providers/Microsoft.Management/managementGroups/{MANAGEMENT_GROUP_ID}",
+    }
+    if subscription_ids:
+        # Filter server-side so only reported subscriptions are aggregated and returned.
+        payload["dataset"]["filter"] = {
+            "dimensions": {"name": "SubscriptionId", "operator": "In", "values": subscription_ids}
+        }
 
-        grouped[str(subscription_id).lower()].append([
-            row_map.get("Cost", row[0] if row else 0),
-            row_map.get("UsageDate", row[1] if len(row) > 1 else None),
-            row_map.get("ServiceName", row[2] if len(row) > 2 else "Unknown"),
-            row_map.get("Currency", row[3] if len(row) > 3 else "USD"),
-        ])
-    return grouped
+    if query == "forecast":
+        # Forecasts start today; actuals come from the actual-cost query.
+        payload["includeActualCost"] = False
+        payload["includeFreshPartialCost"] = False
+    return url, payload
 
 
-async def _fetch_scope_cost_data(
+async def _iter_scope_cost_data(
     access_token,
     start_date,
     end_date,
     query="query",
     granularity="Daily",
+    subscription_ids=None,
 ):
+    """
+    Yield management-group scoped result pages as they arrive.
+
+    With subscription_ids, each query carries a SubscriptionId filter and long
+    lists are split into several filtered queries.
+    """
     if MOCK_AZURE:
         from src.config import SUBSCRIPTIONS
 
@@ -44,7 +79,9 @@ async def _fetch_scope_cost_data(
         for index, row in enumerate(rows):
             subscription_id = SUBSCRIPTIONS[index % len(SUBSCRIPTIONS)]
             enriched_rows.append([row[0], row[1], subscription_id, row[2], row[3]])
-        return {
+        if granularity == "Monthly":
+            enriched_rows = _mock_monthly_rows(enriched_rows)
+        yield {
             "properties": {
                 "columns": [
                     {"name": "Cost", "type": "Number"},
@@ -56,67 +93,133 @@ async def _fetch_scope_cost_data(
                 "rows": enriched_rows,
             }
         }
+        return
+
+    batches = subscription_filter_batches(subscription_ids) if subscription_ids else [None]
+    for batch in batches:
+        url, payload = _scope_query_request(start_date, end_date, query, granularity, batch)
+        async for page in iter_cost_pages(url, access_token, payload, MANAGEMENT_GROUP_ID, query):
+            yield page
+
+
+async def _iter_scope_actual_cost_data(access_token, dates, subscription_ids=None):
+    """Yield management-group actual-cost pages for each planned granularity segment."""
+    for start_date, end_date, granularity in plan_actual_cost_queries(dates):
+        async for page in _iter_scope_cost_data(
+            access_token,
+            start_date,
+            end_date,
+            query="query",
+            granularity=granularity,
+            subscription_ids=subscription_ids,
+        ):
+            yield page
+
+
+async def _accumulate_scope_pages(pages, accumulator_factory, data_status):
+    """
+    Partition each page by subscription as it arrives and feed the columns
+    straight into the per-subscription accumulators.
+    """
+    accumulators = {}
+    codebooks = (CodeBook(), CodeBook(), CodeBook())
+    async for page in pages:
+        data_status.observe(page)
+        for sub_key, columns in partition_page(page, codebooks).items():
+            accumulator = accumulators.get(sub_key)
+            if accumulator is None:
+                accumulator = accumulator_factory()
+                accumulators[sub_key] = accumulator
+            accumulator.add_columns(columns)
+    return accumulators
+
+
+async def get_management_group_subscription_ids(token, management_group_id=None):
+    """
+    Lower-cased ids of the subscriptions under the management group, from its
+    paged descendants listing, or None when the listing is unavailable.
+    """
+    management_group_id = management_group_id or MANAGEMENT_GROUP_ID
+    if MOCK_AZURE:
+        from src.config import SUBSCRIPTIONS
 
-    url = f"{BASE_URL}/providers/Microsoft.CostManagement/{query}?api-version=2021-10-01"
-    payload = {
-        "type": "ActualCost",
-        "timeframe": "Custom",
-        "timePeriod": {"from": start_date, "to": end_date},
-        "dataset": {
-            "granularity": granularity,
-            "aggregation": {"totalCost": {"name": "Cost", "function": "Sum"}},
-            "grouping": [
-                {"type": "Dimension", "name": "SubscriptionId"},
-                {"type": "Dimension", "name": "ServiceName"},
-            ],
-            "sorting": [{"direction": "ascending", "name": "UsageDate"}],
-        },
-        "scope": f"/providers/Microsoft.Management/managementGroups/{MANAGEMENT_GROUP_ID}",
-    }
+        return {sub_id.strip().lower() for sub_id in SUBSCRIPTIONS}
 
-    if query == "forecast":
-        payload["includeActualCost"] = True
-        payload["includeFreshPartialCost"] = True
-
-    return await _throttled_cost_api_call(
-        url,
-        access_token,
-        payload,
-        MANAGEMENT_GROUP_ID,
-        query,
+    url = (
+        f"{BASE_URL}/providers/Microsoft.Management/managementGroups/{management_group_id}"
+        "/descendants?api-version=2020-05-01"
     )
+    subscription_ids = set()
+    try:
+        while url:
+            data = await _throttled_cost_api_call(url, token, None, None, "metadata")
+            for item in data.get("value", []):
+                if str(item.get("type", "")).lower().endswith("/subscriptions"):
+                    subscription_ids.add(str(item.get("name", "")).lower())
+            url = data.get("nextLink")
+    except Exception as e:
+        logger.warning(f"Management group listing failed; membership is unknown: {e}")
+        return None
+    return subscription_ids
 
 
 async def get_management_group_report_entries(token, subscription_ids):
-    """Fetch all configured subscriptions in two management-group scoped queries."""
+    """
+    Fetch all configured subscriptions in two management-group scoped queries,
+    filtered server-side to the configured subscriptions.
+    """
     if not MANAGEMENT_GROUP_ID:
         raise ValueError("MANAGEMENT_GROUP_ID is required when COST_SCOPE=managementGroup")
 
+    started = time.monotonic()
     dates = await get_forecast_month_date(subscription_ids[0], token)
 
-    actual_data = await _fetch_scope_cost_data(
-        token, dates["year_starts_on"], dates["today"], query="query", granularity="Daily"
+    data_status = DataStatus()
+    actual_by_sub = await _accumulate_scope_pages(
+        _iter_scope_actual_cost_data(token, dates, subscription_ids),
+        lambda: DailyMetricsAccumulator(dates),
+        data_status,
     )
-    forecast_data = await _fetch_scope_cost_data(
-        token,
-        dates["year_starts_on"],
-        dates["year_ends_on"],
-        query="forecast",
-        granularity="Daily",
+    forecast_by_sub = await _accumulate_scope_pages(
+        _iter_scope_cost_data(
+            token,
+            dates["today"],
+            dates["year_ends_on"],
+            query="forecast",
+            granularity="Daily",
+            subscription_ids=subscription_ids,
+        ),
+        lambda: ForecastMetricsAccumulator(dates),
+        data_status,
     )
 
-    actual_by_sub = _group_rows_by_subscription(actual_data)
-    forecast_by_sub = _group_rows_by_subscription(forecast_data)
+    rows_by_subscription = {
+        sub_key: accumulator.row_count + getattr(forecast_by_sub.get(sub_key), "row_count", 0)
+        for sub_key, accumulator in actual_by_sub.items()
+    }
+    missing = []
+    without_rows = [sub_id for sub_id in subscription_ids if sub_id.strip().lower() not in actual_by_sub]
+    if without_rows:
+        # No rows may just mean no spend; only subscriptions the group does not contain are missing.
+        members = await get_management_group_subscription_ids(token)
+        if members is not None:
+            missing = [sub_id for sub_id in without_rows if sub_id.strip().lower() not in members]
+    scope_run_stats.record_management_group(
+        MANAGEMENT_GROUP_ID, rows_by_subscription, time.monotonic() - started, missing
+    )
+
+    subscription_names = await get_subscription_names(subscription_ids, token)
 
     entries = []
     for subscription_id in subscription_ids:
         sub_key = subscription_id.strip().lower()
-        subscription_name = await get_subscription_name(subscription_id, token)
-        actual_rows = actual_by_sub.get(sub_key, [])
-        forecast_rows = forecast_by_sub.get(sub_key, [])
-
-        metrics = derive_metrics_from_daily_rows(actual_rows, dates)
-        forecast_metrics = derive_forecast_metrics(forecast_rows, dates)
+        subscription_name = subscription_names[subscription_id]
+        actual = actual_by_sub.get(sub_key) or DailyMetricsAccumulator(dates)
+        forecast = forecast_by_sub.get(sub_key) or ForecastMetricsAccumulator(dates)
+        actual_cube, forecast_cube = actual.cube(), forecast.cube()
+        metrics = actual.result(actual_cube)
+        forecast_metrics = forecast.result(metrics, forecast_cube)
+        publish_report_cubes(subscription_name, actual_cube, forecast_cube)
         currency_symbol = get_currency_symbol(metrics["currency_code"])
 
         entries.append(
@@ -131,6 +234,7 @@ async def get_management_group_report_entries(token, subscription_ids):
                 "dates": dates,
                 "currency_code": metrics["currency_code"],
                 "currency_symbol": currency_symbol,
+                "data_status": data_status.to_dict(),
             }
         )
 
@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+
+from src.config import AZURE_HTTP2, AZURE_HTTP_MAX_CONNECTIONS, AZURE_HTTP_TIMEOUT_SEC
+from src.utils.logger import logger
+
+_client = None
+_client_loop = None
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client():
+    http2 = AZURE_HTTP2 and _http2_available()
+    if AZURE_HTTP2 and not http2:
+        logger.warning("AZURE_HTTP2 is enabled but 'h2' is not installed; falling back to HTTP/1.1.")
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=AZURE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=AZURE_HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=60.0,
+        ),
+        timeout=httpx.Timeout(AZURE_HTTP_TIMEOUT_SEC),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled keep-alive client bound to the running event loop."""
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # A client cannot be shared across event loops (asyncio.run per CLI run,
+        # TestClient portals); the previous loop's pool is simply dropped.
+        _client = _build_client()
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client():
+    """Close the pooled client if it belongs to the running event loop."""
+    global _client, _client_loop
+
+    if _client is not None and not _client.is_closed and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
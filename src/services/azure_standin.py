@@ -0,0 +1,305 @@
+"""
+Local stand-in for the Azure endpoints ACT talks to.
+
+Serves the token, subscription, billing-period and Cost Management
+query/forecast endpoints with synthetic data. It can inject latency, 429
+bursts with retry-after headers, nextLink paging and large row volumes, so
+the real HTTP, retry and throttling code can be load-tested offline:
+
+    python -m src.services.azure_standin --port 8900 --latency-ms 150 --throttle-every 20
+    AZURE_MANAGEMENT_URL=http://localhost:8900 AZURE_LOGIN_URL=http://localhost:8900 \\
+        MOCK_AZURE=false TENANT_ID=standin CLIENT_SECRET=standin python -m src.main --preview
+"""
+import argparse
+import asyncio
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+DEFAULT_SERVICES = [
+    "Virtual Machines",
+    "Azure SQL Database",
+    "Storage Accounts",
+    "Key Vault",
+    "Cognitive Services",
+    "Bandwidth",
+]
+
+
+class StandinSettings:
+    """Knobs for the stand-in server's synthetic data and fault injection."""
+
+    def __init__(
+        self,
+        subscriptions=("standin-sub-1", "standin-sub-2"),
+        services_per_subscription=len(DEFAULT_SERVICES),
+        latency_ms=0.0,
+        latency_jitter_ms=0.0,
+        throttle_every=0,
+        throttle_burst=1,
+        retry_after_sec=1,
+        page_size=5000,
+        currency="USD",
+        billing_start_day=1,
+    ):
+        self.subscriptions = list(subscriptions)
+        self.services_per_subscription = services_per_subscription
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.throttle_every = throttle_every
+        self.throttle_burst = throttle_burst
+        self.retry_after_sec = retry_after_sec
+        self.page_size = page_size
+        self.currency = currency
+        self.billing_start_day = billing_start_day
+
+    def service_names(self):
+        names = DEFAULT_SERVICES[: self.services_per_subscription]
+        names += [f"Service {index:03d}" for index in range(len(names), self.services_per_subscription)]
+        return names
+
+
+class _StandinStats:
+    def __init__(self):
+        self.requests = 0
+        self.cost_requests = 0
+        self.throttled = 0
+        self.by_endpoint = {}
+        self.latencies_ms = []
+
+    def snapshot(self):
+        ordered = sorted(self.latencies_ms)
+
+        def percentile(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+        return {
+            "requests": self.requests,
+            "cost_requests": self.cost_requests,
+            "throttled": self.throttled,
+            "by_endpoint": dict(self.by_endpoint),
+            "latency_ms": {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99)},
+        }
+
+
+def _synthetic_cost(subscription_id, service_index, day_ordinal):
+    seed = zlib.crc32(subscription_id.encode("utf-8"))
+    return ((day_ordinal * 7919 + service_index * 104729 + seed) % 100000) / 1000.0
+
+
+def _periods(start, end, granularity):
+    """Return (row date value, first day ordinal) per Daily day or Monthly month in range."""
+    periods = []
+    current = start
+    if granularity == "Monthly":
+        while current <= end:
+            periods.append((current.strftime("%Y-%m-01T00:00:00"), current.toordinal()))
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return periods
+    while current <= end:
+        periods.append((int(current.strftime("%Y%m%d")), current.toordinal()))
+        current += timedelta(days=1)
+    return periods
+
+
+def create_standin_app(settings=None):
+    settings = settings or StandinSettings()
+    stats = _StandinStats()
+    app = FastAPI(title="ACT Azure stand-in")
+    app.state.settings = settings
+    app.state.stats = stats
+
+    async def simulate(request, endpoint, cost_endpoint=False):
+        stats.requests += 1
+        stats.by_endpoint[endpoint] = stats.by_endpoint.get(endpoint, 0) + 1
+        delay = settings.latency_ms + random.uniform(0, settings.latency_jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if not cost_endpoint:
+            return None
+
+        stats.cost_requests += 1
+        if settings.throttle_every and (
+            (stats.cost_requests - 1) % settings.throttle_every >= settings.throttle_every - settings.throttle_burst
+        ):
+            stats.throttled += 1
+            return JSONResponse(
+                {"error": {"code": "429", "message": "Too many requests. Please retry."}},
+                status_code=429,
+                headers={
+                    "x-ms-ratelimit-microsoft.costmanagement-entity-retry-after": str(settings.retry_after_sec),
+                    "x-ms-ratelimit-microsoft.costmanagement-qpu-remaining": "QueryResource=0",
+                },
+            )
+        return None
+
+    @app.middleware("http")
+    async def record_latency(request: Request, call_next):
+        started = time.monotonic()
+        response = await call_next(request)
+        stats.latencies_ms.append((time.monotonic() - started) * 1000)
+        return response
+
+    @app.post("/{tenant_id}/oauth2/token")
+    async def token(tenant_id: str, request: Request):
+        await simulate(request, "token")
+        return {"access_token": f"standin-token-{tenant_id}", "expires_on": str(int(time.time()) + 3600)}
+
+    @app.get("/_standin/stats")
+    async def get_stats():
+        return stats.snapshot()
+
+    @app.get("/subscriptions")
+    async def list_subscriptions(request: Request):
+        await simulate(request, "subscriptions")
+        offset = int(request.query_params.get("$skiptoken", 0))
+        page = settings.subscriptions[offset: offset + settings.page_size]
+        body = {
+            "value": [
+                {"subscriptionId": sub_id, "displayName": f"Stand-in {sub_id}"} for sub_id in page
+            ]
+        }
+        if offset + settings.page_size < len(settings.subscriptions):
+            body["nextLink"] = str(
+                request.url.include_query_params(**{"$skiptoken": offset + settings.page_size})
+            )
+        return body
+
+    @app.get("/providers/Microsoft.Management/managementGroups/{management_group_id}/descendants")
+    async def management_group_descendants(management_group_id: str, request: Request):
+        await simulate(request, "descendants")
+        return {
+            "value": [
+                {"name": sub_id, "type": "Microsoft.Management/managementGroups/subscriptions"}
+                for sub_id in settings.subscriptions
+            ]
+        }
+
+    @app.get("/subscriptions/{subscription_id}")
+    @app.get("/subscriptions/{subscription_id}/")
+    async def get_subscription(subscription_id: str, request: Request):
+        await simulate(request, "subscription")
+        return {"subscriptionId": subscription_id, "displayName": f"Stand-in {subscription_id}"}
+
+    @app.get("/subscriptions/{subscription_id}/providers/Microsoft.Billing/billingPeriods")
+    async def billing_periods(subscription_id: str, request: Request):
+        await simulate(request, "billingPeriods")
+        today = datetime.now()
+        start = today.replace(day=min(settings.billing_start_day, 28))
+        if start > today:
+            start = (start.replace(day=1) - timedelta(days=1)).replace(day=start.day)
+        end = (start + timedelta(days=32)).replace(day=start.day) - timedelta(days=1)
+        return {
+            "value": [
+                {
+                    "name": start.strftime("%Y%m"),
+                    "properties": {
+                        "billingPeriodStartDate": start.strftime("%Y-%m-%d"),
+                        "billingPeriodEndDate": end.strftime("%Y-%m-%d"),
+                    },
+                }
+            ]
+        }
+
+    async def cost_query(request, query, subscription_ids):
+        throttled = await simulate(request, query, cost_endpoint=True)
+        if throttled is not None:
+            return throttled
+
+        body = await request.json()
+        dimension = (body.get("dataset", {}).get("filter") or {}).get("dimensions") or {}
+        if dimension.get("name") == "SubscriptionId" and dimension.get("operator") == "In":
+            wanted = {value.lower() for value in dimension.get("values", [])}
+            subscription_ids = [sub_id for sub_id in subscription_ids if sub_id.lower() in wanted]
+        period = body.get("timePeriod", {})
+        granularity = body.get("dataset", {}).get("granularity", "Daily")
+        start = datetime.strptime(period["from"][:10], "%Y-%m-%d")
+        end = datetime.strptime(period["to"][:10], "%Y-%m-%d")
+        periods = _periods(start, end, granularity)
+        services = settings.service_names()
+        with_subscription = len(subscription_ids) > 1 or "scope" in body
+        multiplier = 1.2 if query == "forecast" else 1.0
+
+        date_column = "BillingMonth" if granularity == "Monthly" else "UsageDate"
+        columns = [{"name": "Cost", "type": "Number"}, {"name": date_column, "type": "Number"}]
+        if with_subscription:
+            columns.append({"name": "SubscriptionId", "type": "String"})
+        columns += [{"name": "ServiceName", "type": "String"}, {"name": "Currency", "type": "String"}]
+
+        # Rows are generated by index so only the requested page is materialised.
+        per_period = len(subscription_ids) * len(services)
+        total = len(periods) * per_period
+        offset = int(request.query_params.get("$skiptoken", 0))
+        rows = []
+        for index in range(offset, min(total, offset + settings.page_size)):
+            period_index, remainder = divmod(index, per_period)
+            sub_index, service_index = divmod(remainder, len(services))
+            usage_date, ordinal = periods[period_index]
+            sub_id = subscription_ids[sub_index]
+            days = 1 if granularity == "Daily" else 30
+            cost = round(_synthetic_cost(sub_id, service_index, ordinal) * days * multiplier, 6)
+            row = [cost, usage_date]
+            if with_subscription:
+                row.append(sub_id)
+            row += [services[service_index], settings.currency]
+            rows.append(row)
+
+        properties = {"columns": columns, "rows": rows, "nextLink": None}
+        if offset + settings.page_size < total:
+            properties["nextLink"] = str(
+                request.url.include_query_params(**{"$skiptoken": offset + settings.page_size})
+            )
+        return JSONResponse(
+            {"properties": properties},
+            headers={"x-ms-ratelimit-microsoft.costmanagement-qpu-remaining": "QueryResource=100"},
+        )
+
+    @app.post("/subscriptions/{subscription_id}/providers/Microsoft.CostManagement/{query}")
+    async def subscription_cost_query(subscription_id: str, query: str, request: Request):
+        return await cost_query(request, query, [subscription_id])
+
+    @app.post("/providers/Microsoft.CostManagement/{query}")
+    @app.post("/providers/Microsoft.Management/managementGroups/{management_group_id}/providers/Microsoft.CostManagement/{query}")
+    async def scope_cost_query(query: str, request: Request, management_group_id: str = None):
+        return await cost_query(request, query, settings.subscriptions)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Azure Cost Management stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--subscriptions", default="standin-sub-1,standin-sub-2")
+    parser.add_argument("--services", type=int, default=len(DEFAULT_SERVICES), help="Services per subscription")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--throttle-every", type=int, default=0, help="Return a 429 burst every N cost requests")
+    parser.add_argument("--throttle-burst", type=int, default=1)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    settings = StandinSettings(
+        subscriptions=[sub.strip() for sub in args.subscriptions.split(",") if sub.strip()],
+        services_per_subscription=args.services,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        throttle_every=args.throttle_every,
+        throttle_burst=args.throttle_burst,
+        retry_after_sec=args.retry_after,
+        page_size=args.page_size,
+    )
+    uvicorn.run(create_standin_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Record/replay of Azure request/response pairs for deterministic offline runs.
+
+    act --record run.cassette.gz
+    act --replay run.cassette.gz --replay-speed 0
+
+Recording captures every call made through fetch_azure_data and
+get_billing_period (with its wall time) into a gzipped JSON cassette.
+Replaying serves those responses back, sleeping elapsed / speed per call
+(speed 0 = no delay), and freezes the report clock at the recording time so
+the replayed queries match the recorded ones.
+"""
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.services.single_flight import request_key
+from src.utils import clock
+from src.utils.logger import logger
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(RuntimeError):
+    """Raised when a replayed run makes a request the cassette does not contain."""
+
+
+def _interaction_key(kind, url, payload=None):
+    url, payload_hash = request_key(url, payload)
+    return f"{kind} {url} {payload_hash or ''}"
+
+
+class Cassette:
+    def __init__(self, path, mode, speed=1.0, interactions=None, recorded_at=None):
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.interactions = interactions or []
+        self.recorded_at = recorded_at or datetime.now()
+        self._queues = defaultdict(deque)
+        self._last = {}
+        for interaction in self.interactions:
+            self._queues[interaction["key"]].append(interaction)
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    @classmethod
+    def for_recording(cls, path):
+        return cls(path, "record")
+
+    @classmethod
+    def load(cls, path, speed=1.0):
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version in {path}: {data.get('version')}")
+        logger.info(f"Replaying {len(data['interactions'])} recorded Azure responses from {path}")
+        return cls(
+            path,
+            "replay",
+            speed=speed,
+            interactions=data["interactions"],
+            recorded_at=datetime.fromisoformat(data["recorded_at"]),
+        )
+
+    def record(self, kind, url, payload, elapsed, status=200, body=None, error=None):
+        self.interactions.append(
+            {
+                "key": _interaction_key(kind, url, payload),
+                "status": status,
+                "body": body,
+                "error": error,
+                "elapsed": round(elapsed, 4),
+            }
+        )
+
+    async def replay(self, kind, url, payload=None):
+        """Return the recorded (status, body) for a request, re-raising recorded errors."""
+        key = _interaction_key(kind, url, payload)
+        queue = self._queues.get(key)
+        if queue:
+            interaction = queue.popleft()
+            self._last[key] = interaction
+        elif key in self._last:
+            # Requests repeated more often than recorded get the last response again.
+            interaction = self._last[key]
+        else:
+            raise CassetteMiss(f"No recorded response for {kind} {url}")
+
+        if self.speed > 0 and interaction["elapsed"] > 0:
+            await asyncio.sleep(interaction["elapsed"] / self.speed)
+        if interaction.get("error"):
+            raise RuntimeError(f"Recorded failure: {interaction['error']}")
+        return interaction["status"], interaction["body"]
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        data = {
+            "version": CASSETTE_VERSION,
+            "recorded_at": self.recorded_at.isoformat(),
+            "interactions": self.interactions,
+        }
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temp_path, self.path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        logger.info(f"Recorded {len(self.interactions)} Azure responses to {self.path}")
+
+
+active_cassette = None
+
+
+@contextmanager
+def use_cassette(cassette):
+    """
+    Route Azure calls through a cassette for the duration of a run.
+
+    The on-disk response cache is bypassed so recordings capture every
+    request and replays never touch stale entries.
+    """
+    global active_cassette
+    from src.services.response_cache import response_cache
+
+    if cassette is None:
+        yield None
+        return
+
+    previous_cache_state = response_cache.enabled
+    response_cache.enabled = False
+    active_cassette = cassette
+    if cassette.replaying:
+        clock.freeze(cassette.recorded_at)
+    try:
+        yield cassette
+    finally:
+        active_cassette = None
+        response_cache.enabled = previous_cache_state
+        if cassette.replaying:
+            clock.unfreeze()
+        else:
+            cassette.save()
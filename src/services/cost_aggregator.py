@@ -1,44 +1,113 @@
-from collections import defaultdict
-from datetime import datetime
-from decimal import ROUND_HALF_UP, Decimal
-
+from src.config import SERVICE_BREAKDOWN_TOP_N
+from src.services.cost_columns import CostColumns
+from src.services.cost_cube import CostCube, CostCubeBuilder, date_key
+from src.utils.money import MoneyAccumulator, to_cents, to_decimal
 from src.utils.utils import format_currency, get_cost_breakdown, get_currency_symbol
 
 
-def _normalize_usage_date(value) -> datetime | None:
-    """Parse Azure UsageDate values (YYYYMMDD int/str, YYYY-MM-DD, or YYYYMM)."""
-    if value is None:
-        return None
-    text = str(value).strip()
-    if not text:
-        return None
-    if len(text) == 8 and text.isdigit():
-        return datetime.strptime(text, "%Y%m%d")
-    if len(text) == 6 and text.isdigit():
-        return datetime.strptime(text + "01", "%Y%m%d")
-    if len(text) >= 10 and text[4] == "-":
-        return datetime.strptime(text[:10], "%Y-%m-%d")
-    return None
+def _rows_to_cost_data(rows):
+    return {"properties": {"rows": rows}}
 
 
-def _parse_row(row):
-    if len(row) < 4:
-        return None
-    cost, usage_date, service_name, currency = row[0], row[1], row[2], row[3]
-    if not isinstance(cost, (int, float)):
-        return None
-    parsed_date = _normalize_usage_date(usage_date)
-    if parsed_date is None:
-        return None
-    return float(cost), parsed_date, service_name or "Unknown", currency or "USD"
+class DailyMetricsAccumulator:
+    """
+    Incrementally derive daily, MTD, YTD totals and MTD service breakdown from
+    Daily-granularity rows, one result page at a time.
+    Row shape: [cost, usageDate, serviceName, currency], or CostColumns via add_columns().
 
+    Rows are bucketed into a CostCube spanning the reporting year and current
+    billing period; every figure in result() is a range lookup on it.
+    """
 
-def _in_range(parsed_date: datetime, start: datetime, end: datetime) -> bool:
-    return start.date() <= parsed_date.date() <= end.date()
+    def __init__(self, dates: dict):
+        self.dates = dates
+        self._yesterday = date_key(dates["yesterday"])
+        self._month_start = date_key(dates["month_starts_on"])
+        self._today = date_key(dates["today"])
+        self._year_start = date_key(dates["year_starts_on"])
+
+        self._cube = CostCubeBuilder(min(self._yesterday, self._month_start, self._year_start), self._today)
+        self.row_count = 0
+
+    @property
+    def currency_code(self):
+        return self._cube.currency_code
+
+    def add_rows(self, rows):
+        self.row_count += len(rows)
+        self._cube.add(CostColumns.from_rows(rows))
+
+    def add_columns(self, columns: CostColumns):
+        self.row_count += len(columns)
+        self._cube.add(columns)
+
+    def cube(self) -> CostCube:
+        return self._cube.build()
+
+    def result(self, cube: CostCube | None = None) -> dict:
+        cube = cube or self.cube()
+        month = (self._month_start, self._today)
+        year = (self._year_start, self._today)
+        mtd_rows = [
+            [to_decimal(units), self.dates["month_starts_on"], service, cube.currency_code]
+            for service, units in cube.breakdown_units(*month).items()
+        ]
+        service_breakdown, _ = get_cost_breakdown(_rows_to_cost_data(mtd_rows), SERVICE_BREAKDOWN_TOP_N)
+
+        return {
+            "daily_cost": to_cents(cube.total_units(self._yesterday, self._yesterday)),
+            "month_to_day": to_cents(cube.total_units(*month)),
+            "year_to_day": to_cents(cube.total_units(*year)),
+            "service_breakdown": service_breakdown,
+            "currency_code": cube.currency_code,
+            # Actuals before today, which a forecast starting today is added onto.
+            "month_actual_before_today": to_decimal(cube.total_units(self._month_start, self._today - 1)),
+            "year_actual_before_today": to_decimal(cube.total_units(self._year_start, self._today - 1)),
+        }
+
+
+class ForecastMetricsAccumulator:
+    """
+    Incrementally derive month and year forecast totals from forecast rows.
+    Supports Daily or Monthly granularity rows.
 
+    When the forecast only covers today onwards, pass the actual metrics to
+    result() so actuals before today are added to each total.
+    """
 
-def _rows_to_cost_data(rows):
-    return {"properties": {"rows": rows}}
+    def __init__(self, dates: dict):
+        self._month_start = date_key(dates["month_starts_on"])
+        self._month_end = date_key(dates["month_ends_on"])
+        self._year_start = date_key(dates["year_starts_on"])
+        self._year_end = date_key(dates["year_ends_on"])
+
+        self._cube = CostCubeBuilder(
+            min(self._month_start, self._year_start), max(self._month_end, self._year_end)
+        )
+        self.row_count = 0
+
+    def add_rows(self, rows):
+        self.row_count += len(rows)
+        self._cube.add(CostColumns.from_rows(rows))
+
+    def add_columns(self, columns: CostColumns):
+        self.row_count += len(columns)
+        self._cube.add(columns)
+
+    def cube(self) -> CostCube:
+        return self._cube.build()
+
+    def result(self, actual_metrics: dict | None = None, cube: CostCube | None = None) -> dict:
+        cube = cube or self.cube()
+        month_total = MoneyAccumulator(cube.total_units(self._month_start, self._month_end))
+        year_total = MoneyAccumulator(cube.total_units(self._year_start, self._year_end))
+        if actual_metrics:
+            month_total.add(actual_metrics["month_actual_before_today"])
+            year_total.add(actual_metrics["year_actual_before_today"])
+        return {
+            "month_forecast": month_total.cents(),
+            "year_forecast": year_total.cents(),
+        }
 
 
 def derive_metrics_from_daily_rows(rows, dates: dict) -> dict:
@@ -46,79 +115,17 @@ def derive_metrics_from_daily_rows(rows, dates: dict) -> dict:
     Derive daily, MTD, YTD totals and MTD service breakdown from Daily-granularity rows.
     Row shape: [cost, usageDate, serviceName, currency]
     """
-    yesterday = datetime.strptime(dates["yesterday"], "%Y-%m-%d")
-    month_start = datetime.strptime(dates["month_starts_on"], "%Y-%m-%d")
-    today = datetime.strptime(dates["today"], "%Y-%m-%d")
-    year_start = datetime.strptime(dates["year_starts_on"], "%Y-%m-%d")
-
-    daily_total = Decimal("0")
-    mtd_total = Decimal("0")
-    ytd_total = Decimal("0")
-    mtd_by_service: dict[str, float] = defaultdict(float)
-    currency_code = "USD"
-
-    for row in rows:
-        parsed = _parse_row(row)
-        if not parsed:
-            continue
-        cost, parsed_date, service_name, currency = parsed
-        currency_code = currency
-        cost_dec = Decimal(str(cost))
-
-        if parsed_date.date() == yesterday.date():
-            daily_total += cost_dec
-
-        if _in_range(parsed_date, month_start, today):
-            mtd_total += cost_dec
-            mtd_by_service[service_name] += cost
-            currency_code = currency
-
-        if _in_range(parsed_date, year_start, today):
-            ytd_total += cost_dec
-
-    quantize = lambda value: value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    mtd_rows = [
-        [cost, dates["month_starts_on"], service, currency_code]
-        for service, cost in mtd_by_service.items()
-    ]
-    service_breakdown, _ = get_cost_breakdown(_rows_to_cost_data(mtd_rows))
-
-    return {
-        "daily_cost": quantize(daily_total),
-        "month_to_day": quantize(mtd_total),
-        "year_to_day": quantize(ytd_total),
-        "service_breakdown": service_breakdown,
-        "currency_code": currency_code,
-    }
-
-
-def derive_forecast_metrics(rows, dates: dict) -> dict:
+    accumulator = DailyMetricsAccumulator(dates)
+    accumulator.add_rows(rows)
+    return accumulator.result()
+
+
+def derive_forecast_metrics(rows, dates: dict, actual_metrics: dict | None = None) -> dict:
     """
-    Derive month and year forecast totals from a single forecast query (year range).
-    Supports Daily or Monthly granularity rows.
+    Derive month and year forecast totals from a single forecast query.
+    Supports Daily or Monthly granularity rows. Pass actual_metrics (from
+    derive_metrics_from_daily_rows) when the forecast starts today.
     """
-    month_start = datetime.strptime(dates["month_starts_on"], "%Y-%m-%d")
-    month_end = datetime.strptime(dates["month_ends_on"], "%Y-%m-%d")
-    year_start = datetime.strptime(dates["year_starts_on"], "%Y-%m-%d")
-    year_end = datetime.strptime(dates["year_ends_on"], "%Y-%m-%d")
-
-    month_total = Decimal("0")
-    year_total = Decimal("0")
-
-    for row in rows:
-        parsed = _parse_row(row)
-        if not parsed:
-            continue
-        cost, parsed_date, _, _ = parsed
-        cost_dec = Decimal(str(cost))
-
-        if _in_range(parsed_date, year_start, year_end):
-            year_total += cost_dec
-        if _in_range(parsed_date, month_start, month_end):
-            month_total += cost_dec
-
-    quantize = lambda value: value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    return {
-        "month_forecast": quantize(month_total),
-        "year_forecast": quantize(year_total),
-    }
+    accumulator = ForecastMetricsAccumulator(dates)
+    accumulator.add_rows(rows)
+    return accumulator.result(actual_metrics)
@@ -0,0 +1,302 @@
+"""
+Columnar storage for Cost Management result rows.
+
+Rows arrive as lists like [cost, usageDate, serviceName, currency], with the
+service, currency and (for management-group queries) subscription strings
+repeated in every row. CostColumns keeps one typed array per column instead:
+fixed-point costs (src.utils.money units), integer day keys, and dictionary
+codes for the repeated strings. Slices share the parent's buffers, so
+partitioning by subscription or date range copies nothing.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from src.utils.money import SCALE
+
+
+def _normalize_usage_date(value) -> datetime | None:
+    """Parse Azure UsageDate values (YYYYMMDD int/str, YYYY-MM-DD, or YYYYMM)."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    if len(text) == 8 and text.isdigit():
+        return datetime.strptime(text, "%Y%m%d")
+    if len(text) == 6 and text.isdigit():
+        return datetime.strptime(text + "01", "%Y%m%d")
+    if len(text) >= 10 and text[4] == "-":
+        return datetime.strptime(text[:10], "%Y-%m-%d")
+    return None
+
+
+# UsageDate value -> day key (proleptic ordinal), shared by every accumulator.
+_day_keys: dict = {}
+_DAY_KEY_MEMO_LIMIT = 50000
+
+
+def day_key(value) -> int | None:
+    """Return the integer day key for a UsageDate value, parsing each distinct value once."""
+    try:
+        return _day_keys[value]
+    except KeyError:
+        pass
+    except TypeError:
+        parsed = _normalize_usage_date(value)
+        return parsed.toordinal() if parsed else None
+
+    parsed = _normalize_usage_date(value)
+    key = parsed.toordinal() if parsed else None
+    if len(_day_keys) >= _DAY_KEY_MEMO_LIMIT:
+        _day_keys.clear()
+    _day_keys[value] = key
+    return key
+
+
+class CodeBook:
+    """Dictionary encoding for a repeated string column."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def encode(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, code):
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _column_indices(column_names):
+    """Resolve (cost, date, subscription, service, currency) positions once per page."""
+    if not column_names:
+        return 0, 1, None, 2, 3
+    positions = {name: index for index, name in enumerate(column_names)}
+
+    def find(names, default=None):
+        return next((positions[name] for name in names if name in positions), default)
+
+    return (
+        find(("Cost", "PreTaxCost", "CostUSD"), 0),
+        find(("UsageDate", "BillingMonth"), 1),
+        find(("SubscriptionId", "SubscriptionName")),
+        find(("ServiceName",), 2),
+        find(("Currency",), 3),
+    )
+
+
+def _encode_rows(rows, column_names, codebooks, columns_for, subscription_id=None):
+    """
+    Validate and encode rows in one pass, appending each to columns_for(subscription key).
+
+    Column positions are resolved once, and the append targets of each
+    distinct subscription value are looked up once, so a row costs no
+    allocation beyond the values stored.
+    """
+    cost_at, date_at, subscription_at, service_at, currency_at = _column_indices(column_names)
+    width = max(index for index in (cost_at, date_at, subscription_at, service_at, currency_at) if index is not None)
+    service_names, currency_codes, subscription_ids = codebooks
+
+    def writer(subscription):
+        key = str(subscription or "").lower()
+        columns = columns_for(key)
+        return (
+            columns.costs.append,
+            columns.days.append,
+            columns.services.append,
+            columns.currencies.append,
+            columns.subscriptions.append,
+            subscription_ids.encode(key),
+        )
+
+    fixed_writer = writer(subscription_id) if subscription_at is None else None
+    writers = {}
+    day_keys = _day_keys
+    service_codes, encode_service = service_names._codes, service_names.encode
+    currency_lookup, encode_currency = currency_codes._codes, currency_codes.encode
+    for row in rows:
+        if len(row) <= width:
+            continue
+        cost = row[cost_at]
+        if not isinstance(cost, (int, float)):
+            continue
+        usage_date = row[date_at]
+        try:
+            day = day_keys[usage_date]
+        except (KeyError, TypeError):
+            day = day_key(usage_date)
+        if day is None:
+            continue
+        if fixed_writer is not None:
+            write = fixed_writer
+        else:
+            subscription = row[subscription_at]
+            if not subscription:
+                continue
+            write = writers.get(subscription)
+            if write is None:
+                write = writers[subscription] = writer(subscription)
+
+        service = row[service_at] or "Unknown"
+        service_code = service_codes.get(service)
+        if service_code is None:
+            service_code = encode_service(service)
+        currency = row[currency_at] or "USD"
+        currency_code = currency_lookup.get(currency)
+        if currency_code is None:
+            currency_code = encode_currency(currency)
+
+        add_cost, add_day, add_service, add_currency, add_subscription, subscription_code = write
+        add_cost(round(cost * SCALE))
+        add_day(day)
+        add_service(service_code)
+        add_currency(currency_code)
+        add_subscription(subscription_code)
+
+
+class CostColumns:
+    """
+    Cost rows stored column by column.
+
+    costs are int64 fixed-point units, days are ordinal day keys, and services,
+    currencies and subscriptions are codes into CodeBooks shared with every
+    slice. Rows whose cost is not numeric or whose date cannot be parsed are
+    dropped on append, as the aggregators always have.
+    """
+
+    def __init__(self, codebooks=None):
+        self.costs = array("q")
+        self.days = array("i")
+        self.services = array("I")
+        self.currencies = array("H")
+        self.subscriptions = array("I")
+        self.service_names, self.currency_codes, self.subscription_ids = codebooks or (
+            CodeBook(),
+            CodeBook(),
+            CodeBook(),
+        )
+        self.day_sorted = False
+
+    @classmethod
+    def from_rows(cls, rows, column_names=None, subscription_id=None):
+        columns = cls()
+        columns.append_rows(rows, column_names, subscription_id)
+        return columns
+
+    @classmethod
+    def from_page(cls, cost_data, subscription_id=None):
+        properties = cost_data.get("properties", {})
+        column_names = [column.get("name") for column in properties.get("columns") or []]
+        return cls.from_rows(properties.get("rows", []), column_names, subscription_id)
+
+    @property
+    def codebooks(self):
+        return self.service_names, self.currency_codes, self.subscription_ids
+
+    def append_rows(self, rows, column_names=None, subscription_id=None):
+        """
+        Encode result rows onto the columns.
+
+        column_names come from properties.columns; without them rows are read
+        positionally as [cost, usageDate, serviceName, currency]. Rows of a
+        subscription-grouped page without a subscription value are skipped.
+        """
+        _encode_rows(rows, column_names, self.codebooks, lambda _key: self, subscription_id)
+        self.day_sorted = False
+
+    def __len__(self):
+        return len(self.costs)
+
+    @property
+    def nbytes(self):
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.costs, self.days, self.services, self.currencies, self.subscriptions)
+        )
+
+    @property
+    def currency_code(self):
+        """Currency of the last row, which the reports have always used."""
+        return self.currency_codes[self.currencies[-1]] if len(self) else None
+
+    def _view(self, start, stop):
+        view = CostColumns((self.service_names, self.currency_codes, self.subscription_ids))
+        view.costs = memoryview(self.costs)[start:stop]
+        view.days = memoryview(self.days)[start:stop]
+        view.services = memoryview(self.services)[start:stop]
+        view.currencies = memoryview(self.currencies)[start:stop]
+        view.subscriptions = memoryview(self.subscriptions)[start:stop]
+        view.day_sorted = self.day_sorted
+        return view
+
+    def sorted(self):
+        """Return the rows ordered by subscription and day (self when already ordered)."""
+        keys = list(zip(self.subscriptions, self.days))
+        # Days are only globally ordered when the rows belong to one subscription.
+        single_subscription = len(set(self.subscriptions)) <= 1
+        if all(keys[index] <= keys[index + 1] for index in range(len(keys) - 1)):
+            self.day_sorted = single_subscription
+            return self
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        ordered = CostColumns((self.service_names, self.currency_codes, self.subscription_ids))
+        for name in ("costs", "days", "services", "currencies", "subscriptions"):
+            column = getattr(self, name)
+            setattr(ordered, name, array(getattr(ordered, name).typecode, [column[index] for index in order]))
+        ordered.day_sorted = single_subscription
+        return ordered
+
+    def by_subscription(self):
+        """
+        Partition into {subscription id: zero-copy view}, each ordered by day.
+
+        Subscription ids are lower-cased. The views share one sorted buffer, so
+        it cannot be appended to while they are alive.
+        """
+        ordered = self.sorted()
+        subscriptions = ordered.subscriptions
+        views = {}
+        start = 0
+        while start < len(ordered):
+            code = subscriptions[start]
+            stop = bisect_right(subscriptions, code, start)
+            view = ordered._view(start, stop)
+            view.day_sorted = True
+            views[self.subscription_ids[code]] = view
+            start = stop
+        return views
+
+    def between(self, start_day, end_day):
+        """Zero-copy view of the rows with start_day <= day <= end_day."""
+        if not self.day_sorted:
+            raise ValueError("CostColumns.between() needs day-ordered rows; use by_subscription() or sorted()")
+        return self._view(bisect_left(self.days, start_day), bisect_right(self.days, end_day))
+
+
+def partition_page(cost_data, codebooks=None):
+    """
+    Split a subscription-grouped (management-group) page into
+    {subscription id (lower-cased): CostColumns} in one streaming pass.
+
+    Pass the same codebooks for every page of a query so codes stay stable.
+    """
+    properties = cost_data.get("properties", {})
+    column_names = [column.get("name") for column in properties.get("columns") or []]
+    codebooks = codebooks or (CodeBook(), CodeBook(), CodeBook())
+    partitions = {}
+
+    def columns_for(subscription_key):
+        columns = partitions.get(subscription_key)
+        if columns is None:
+            columns = partitions[subscription_key] = CostColumns(codebooks)
+        return columns
+
+    _encode_rows(properties.get("rows", []), column_names, codebooks, columns_for)
+    return partitions
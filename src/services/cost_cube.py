@@ -0,0 +1,194 @@
+"""
+Prefix-sum cost cube: subscription x service x day.
+
+The accumulators bucket cost rows by service and day, then keep running
+totals so any date-range total is two lookups (O(1)) and any range breakdown
+is two lookups per service. Closed months fetched at Monthly granularity land
+on the first day of their month, so ranges inside those months resolve to
+whole months.
+"""
+from array import array
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from itertools import accumulate
+
+from src.services import cost_vectorized
+from src.utils.money import to_cents
+
+
+def date_key(text: str) -> int:
+    return datetime.strptime(text, "%Y-%m-%d").toordinal()
+
+
+def _prefix_sums(daily_by_key):
+    return {key: array("q", accumulate(daily, initial=0)) for key, daily in daily_by_key.items()}
+
+
+class CostCube:
+    """
+    Cumulative daily costs of one subscription, per service.
+
+    For a day offset i from first_day, costs[service][i] is the cost of the
+    days before it and rows[service][i] the number of rows, so a range
+    [start, end] is prefix[end + 1] - prefix[start]. total is the same
+    running sum across all services.
+    """
+
+    def __init__(self, first_day, last_day, costs, rows, total, currency_code="USD"):
+        self.first_day = first_day
+        self.last_day = last_day
+        self.costs = costs
+        self.rows = rows
+        self.total = total
+        self.currency_code = currency_code
+
+    def _offsets(self, start_day, end_day):
+        start = max(start_day, self.first_day) - self.first_day
+        stop = min(end_day, self.last_day) - self.first_day + 1
+        return (start, stop) if start < stop else (0, 0)
+
+    def total_units(self, start_day, end_day) -> int:
+        """Fixed-point cost of every service over [start_day, end_day]."""
+        start, stop = self._offsets(start_day, end_day)
+        return self.total[stop] - self.total[start]
+
+    def breakdown_units(self, start_day, end_day) -> dict:
+        """Fixed-point cost per service over [start_day, end_day], for services with rows in it."""
+        start, stop = self._offsets(start_day, end_day)
+        return {
+            service: prefix[stop] - prefix[start]
+            for service, prefix in self.costs.items()
+            if self.rows[service][stop] != self.rows[service][start]
+        }
+
+    def total_for(self, start_date: str, end_date: str):
+        """Range total for YYYY-MM-DD bounds, rounded to cents."""
+        return to_cents(self.total_units(date_key(start_date), date_key(end_date)))
+
+    def breakdown_for(self, start_date: str, end_date: str) -> dict:
+        """Per-service totals for YYYY-MM-DD bounds, rounded to cents."""
+        return {
+            service: to_cents(units)
+            for service, units in self.breakdown_units(date_key(start_date), date_key(end_date)).items()
+        }
+
+
+class CostCubeBuilder:
+    """
+    Buckets CostColumns batches into per-service daily totals over a fixed
+    day window; build() turns them into a CostCube. Rows outside the window
+    are ignored.
+    """
+
+    def __init__(self, first_day, last_day):
+        self.first_day = first_day
+        self.last_day = last_day
+        self._span = last_day - first_day + 1
+        self._costs = {}
+        self._rows = {}
+        self._total = array("q", bytes(8 * self._span))
+        self.currency_code = "USD"
+
+    def _buckets(self, service):
+        costs = self._costs.get(service)
+        if costs is None:
+            costs = self._costs[service] = array("q", bytes(8 * self._span))
+            self._rows[service] = array("q", bytes(8 * self._span))
+        return costs, self._rows[service]
+
+    def add(self, columns):
+        if not len(columns):
+            return
+        self.currency_code = columns.currency_code
+        if cost_vectorized.should_vectorize(columns):
+            cost_vectorized.bucket_columns(columns, self.first_day, self._span, self._buckets, self._total)
+            return
+
+        first_day, span, total = self.first_day, self._span, self._total
+        buckets = {}
+        for units, day, code in zip(columns.costs, columns.days, columns.services):
+            offset = day - first_day
+            if not 0 <= offset < span:
+                continue
+            service_buckets = buckets.get(code)
+            if service_buckets is None:
+                service_buckets = buckets[code] = self._buckets(columns.service_names[code])
+            service_buckets[0][offset] += units
+            service_buckets[1][offset] += 1
+            total[offset] += units
+
+    def build(self) -> CostCube:
+        if cost_vectorized.available():
+            prefix_sums = cost_vectorized.prefix_sums
+        else:
+            prefix_sums = _prefix_sums
+        return CostCube(
+            self.first_day,
+            self.last_day,
+            prefix_sums(self._costs),
+            prefix_sums(self._rows),
+            prefix_sums({None: self._total})[None],
+            self.currency_code,
+        )
+
+
+class ReportCubes:
+    """Actual and forecast cubes of one report, keyed by subscription name."""
+
+    def __init__(self):
+        self.actual = {}
+        self.forecast = {}
+
+    def publish(self, subscription_name, actual, forecast=None):
+        self.actual[subscription_name] = actual
+        if forecast is not None:
+            self.forecast[subscription_name] = forecast
+
+    def range_summary(self, start_date, end_date, subscription_name=None):
+        """
+        Actual and forecast totals plus the actual service breakdown of every
+        subscription (or one) over [start_date, end_date], as YYYY-MM-DD.
+        """
+        if date_key(start_date) > date_key(end_date):
+            raise ValueError("start date must not be after end date")
+        names = sorted(self.actual) if subscription_name is None else [subscription_name]
+        subscriptions = []
+        for name in names:
+            actual = self.actual.get(name)
+            if actual is None:
+                raise KeyError(name)
+            forecast = self.forecast.get(name)
+            breakdown = sorted(actual.breakdown_for(start_date, end_date).items(), key=lambda item: -item[1])
+            subscriptions.append(
+                {
+                    "subscription_name": name,
+                    "currency_code": actual.currency_code,
+                    "actual": actual.total_for(start_date, end_date),
+                    "forecast": forecast.total_for(start_date, end_date) if forecast else None,
+                    "service_breakdown": [{"service": service, "cost": cost} for service, cost in breakdown],
+                }
+            )
+        return {"from": start_date, "to": end_date, "subscriptions": subscriptions}
+
+
+_collecting = ContextVar("report_cubes", default=None)
+
+
+@contextmanager
+def collect_report_cubes(cubes):
+    """
+    Publish the cubes built inside the block into cubes (a ReportCubes, or
+    None to drop them). Tasks started inside the block inherit the target.
+    """
+    token = _collecting.set(cubes)
+    try:
+        yield cubes
+    finally:
+        _collecting.reset(token)
+
+
+def publish_report_cubes(subscription_name, actual, forecast=None):
+    cubes = _collecting.get()
+    if cubes is not None:
+        cubes.publish(subscription_name, actual, forecast)
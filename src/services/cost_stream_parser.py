@@ -0,0 +1,88 @@
+import json
+import re
+
+_ROWS_KEY_RE = re.compile(r'"rows"\s*:\s*\[')
+_COLUMNS_KEY_RE = re.compile(r'"columns"\s*:\s*')
+_WHITESPACE = " \t\r\n"
+
+
+class CostRowStreamParser:
+    """
+    Incrementally extracts properties.rows from a streamed Cost Management response.
+
+    Text is fed as it arrives off the socket; each complete row is decoded on
+    its own and returned immediately, so the full body is never held as one
+    string or one parsed document. Everything outside the rows array (columns,
+    nextLink) is kept as a small skeleton and parsed by close().
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._head = ""
+        self._tail = ""
+        self._state = "head"
+        self.columns = None
+
+    def feed(self, text):
+        """Consume the next chunk of text and return the rows it completed."""
+        self._buffer += text
+        rows = []
+
+        if self._state == "head":
+            match = _ROWS_KEY_RE.search(self._buffer)
+            if not match:
+                return rows
+            self._head = self._buffer[: match.end() - 1]
+            self._buffer = self._buffer[match.end():]
+            self.columns = self._parse_columns(self._head)
+            self._state = "rows"
+
+        if self._state == "rows":
+            position = 0
+            length = len(self._buffer)
+            while True:
+                while position < length and (
+                    self._buffer[position] in _WHITESPACE or self._buffer[position] == ","
+                ):
+                    position += 1
+                if position >= length:
+                    break
+                if self._buffer[position] == "]":
+                    self._state = "tail"
+                    self._tail = self._buffer[position + 1:]
+                    self._buffer = ""
+                    return rows
+                try:
+                    row, position = self._decoder.raw_decode(self._buffer, position)
+                except ValueError:
+                    # Row is split across chunks; wait for more text.
+                    break
+                rows.append(row)
+            self._buffer = self._buffer[position:]
+            return rows
+
+        self._tail += self._buffer
+        self._buffer = ""
+        return rows
+
+    def close(self):
+        """Return the response without its rows (columns, nextLink, ...)."""
+        if self._state == "head":
+            return json.loads(self._buffer) if self._buffer.strip() else {}
+        if self._state != "tail":
+            raise ValueError("Cost response stream ended inside properties.rows")
+        skeleton = json.loads(self._head + "[]" + self._tail)
+        if self.columns is None:
+            self.columns = skeleton.get("properties", {}).get("columns")
+        return skeleton
+
+    def _parse_columns(self, head):
+        match = _COLUMNS_KEY_RE.search(head)
+        if not match:
+            return None
+        try:
+            columns, _ = self._decoder.raw_decode(head, match.end())
+        except ValueError:
+            return None
+        return columns
@@ -0,0 +1,158 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from src.config import COST_SYNC_DIR, COST_SYNC_TRAILING_DAYS
+from src.services.azure_cost import iter_cost_data
+from src.services.cost_columns import _normalize_usage_date
+from src.services.response_cache import STALE_AS_OF_KEY
+from src.utils.logger import logger
+
+_DAY_FORMAT = "%Y%m%d"
+
+
+def _day_range(start, end):
+    current = start
+    while current <= end:
+        yield current
+        current += timedelta(days=1)
+
+
+def missing_ranges(stored_days, start, end):
+    """Collapse the days in [start, end] absent from stored_days into contiguous ranges."""
+    ranges = []
+    range_start = None
+    previous = None
+    for day in _day_range(start, end):
+        if day.strftime(_DAY_FORMAT) in stored_days:
+            if range_start is not None:
+                ranges.append((range_start, previous))
+                range_start = None
+        elif range_start is None:
+            range_start = day
+        previous = day
+    if range_start is not None:
+        ranges.append((range_start, previous))
+    return ranges
+
+
+class DailyRowStore:
+    """Settled Daily cost rows per subscription, persisted as gzipped JSON keyed by day."""
+
+    def __init__(self, store_dir=COST_SYNC_DIR):
+        self.store_dir = store_dir
+
+    def _path(self, subscription_id):
+        safe_id = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in subscription_id.lower())
+        return os.path.join(self.store_dir, f"{safe_id}.json.gz")
+
+    def load(self, subscription_id):
+        path = self._path(subscription_id)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                return json.load(file).get("days", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable daily row store {path}: {e}")
+            return {}
+
+    def save(self, subscription_id, days):
+        os.makedirs(self.store_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.store_dir)
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as file:
+                json.dump({"days": days}, file)
+            os.replace(temp_path, self._path(subscription_id))
+        except OSError as e:
+            logger.warning(f"Failed to save daily row store for {subscription_id}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def _rows_by_day(rows):
+    grouped = {}
+    for row in rows:
+        if len(row) < 2:
+            continue
+        parsed = _normalize_usage_date(row[1])
+        if parsed is None:
+            continue
+        grouped.setdefault(parsed.strftime(_DAY_FORMAT), []).append(row)
+    return grouped
+
+
+async def iter_incremental_daily_pages(
+    access_token,
+    start_date,
+    end_date,
+    subscription_id,
+    store=None,
+    trailing_days=COST_SYNC_TRAILING_DAYS,
+):
+    """
+    Yield Daily actual-cost pages for [start_date, end_date], fetching only
+    the trailing unsettled window plus any gaps missing from the store.
+
+    Settled days are served from the per-subscription DailyRowStore, and
+    newly fetched settled days are written back after a complete sync in
+    which no page came from the response cache's stale fallback.
+    """
+    store = store or DailyRowStore()
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    settled_end = end - timedelta(days=trailing_days)
+
+    stored_days = store.load(subscription_id)
+    fetch_ranges = missing_ranges(stored_days, start, settled_end) if settled_end >= start else []
+    recent_start = max(start, settled_end + timedelta(days=1))
+    if recent_start <= end:
+        fetch_ranges.append((recent_start, end))
+
+    logger.info(
+        f"Incremental sync [subscription={subscription_id}]: "
+        f"{len(stored_days)} settled days stored, fetching {len(fetch_ranges)} range(s)"
+    )
+
+    # Settled days already on disk go out first as one page.
+    settled_end_key = settled_end.strftime(_DAY_FORMAT)
+    start_key = start.strftime(_DAY_FORMAT)
+    stored_rows = [
+        row
+        for day, rows in sorted(stored_days.items())
+        if start_key <= day <= settled_end_key
+        for row in rows
+    ]
+    if stored_rows:
+        yield {"properties": {"rows": stored_rows}}
+
+    newly_settled = {}
+    stale = False
+    for range_start, range_end in fetch_ranges:
+        async for page in iter_cost_data(
+            access_token,
+            range_start.strftime("%Y-%m-%d"),
+            range_end.strftime("%Y-%m-%d"),
+            subscription_id,
+            query="query",
+            granularity="Daily",
+        ):
+            yield page
+            stale = stale or bool((page or {}).get(STALE_AS_OF_KEY))
+            for day, rows in _rows_by_day(page.get("properties", {}).get("rows", [])).items():
+                if day <= settled_end_key:
+                    newly_settled.setdefault(day, []).extend(rows)
+
+        # Days without any rows are settled too; remember them so they are not re-fetched.
+        if range_start <= settled_end:
+            for day in _day_range(range_start, min(range_end, settled_end)):
+                newly_settled.setdefault(day.strftime(_DAY_FORMAT), [])
+
+    if stale:
+        # A last-known-good fallback may be an older, shorter response; its missing
+        # days are not known to be empty, so nothing from this sync is persisted.
+        logger.warning(f"Incremental sync [subscription={subscription_id}]: stale pages served, store not updated")
+    elif newly_settled:
+        store.save(subscription_id, {**stored_days, **newly_settled})
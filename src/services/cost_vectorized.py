@@ -0,0 +1,69 @@
+"""
+Optional NumPy backend for the cost accumulators.
+
+Large CostColumns batches are viewed as NumPy arrays without copying (fixed-
+point costs, integer day keys, service codes) and added into the cost cube's
+per-service daily buckets with grouped scatter-adds instead of a per-row
+Python loop. Costs are already in src.utils.money units, so both backends
+produce identical totals.
+
+Install with ``pip install azure-cost-tracker[fast]``; without NumPy the
+accumulators keep their pure-Python path.
+"""
+from array import array
+
+from src.config import COST_VECTORIZE_MIN_ROWS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when the extra is not installed
+    np = None
+
+
+def available():
+    return np is not None
+
+
+def should_vectorize(columns):
+    return np is not None and len(columns) >= COST_VECTORIZE_MIN_ROWS
+
+
+def _arrays(columns):
+    return (
+        np.frombuffer(columns.costs, dtype=np.int64),
+        np.frombuffer(columns.days, dtype=np.int32),
+        np.frombuffer(columns.services, dtype=np.uint32),
+    )
+
+
+def bucket_columns(columns, first_day, span, buckets_for, total):
+    """
+    Add one batch of columns into per-service daily buckets in place.
+
+    buckets_for(service name) returns that service's (costs, rows) int64
+    arrays of length span, indexed by day offset from first_day; total is the
+    all-service daily array.
+    """
+    units, days, services = _arrays(columns)
+    offsets = days.astype(np.int64) - first_day
+    inside = (offsets >= 0) & (offsets < span)
+    codes, batch_index = np.unique(services[inside], return_inverse=True)
+    costs = np.zeros((len(codes), span), dtype=np.int64)
+    rows = np.zeros((len(codes), span), dtype=np.int64)
+    np.add.at(costs, (batch_index, offsets[inside]), units[inside])
+    np.add.at(rows, (batch_index, offsets[inside]), 1)
+    np.frombuffer(total, dtype=np.int64)[:] += costs.sum(axis=0)
+    for index, code in enumerate(codes):
+        service_costs, service_rows = buckets_for(columns.service_names[int(code)])
+        np.frombuffer(service_costs, dtype=np.int64)[:] += costs[index]
+        np.frombuffer(service_rows, dtype=np.int64)[:] += rows[index]
+
+
+def prefix_sums(daily_by_key):
+    """Running totals (with a leading zero) of each int64 daily array."""
+    prefixes = {}
+    for key, daily in daily_by_key.items():
+        prefix = array("q", bytes(8))
+        prefix.frombytes(np.cumsum(np.frombuffer(daily, dtype=np.int64)).tobytes())
+        prefixes[key] = prefix
+    return prefixes
@@ -0,0 +1,185 @@
+import asyncio
+import re
+import time
+
+from src.config import (
+    COST_API_BURST,
+    COST_API_INITIAL_RATE,
+    COST_API_MAX_RATE,
+    COST_API_MIN_RATE,
+)
+from src.utils.logger import logger
+
+TENANT_SCOPE = "tenant"
+
+RETRY_AFTER_HEADERS = (
+    "x-ms-ratelimit-microsoft.costmanagement-entity-retry-after",
+    "x-ms-ratelimit-microsoft.costmanagement-tenant-retry-after",
+    "x-ms-ratelimit-microsoft.costmanagement-clienttype-retry-after",
+    "retry-after",
+)
+
+_TENANT_RETRY_AFTER_HEADER = "x-ms-ratelimit-microsoft.costmanagement-tenant-retry-after"
+_SUBSCRIPTION_SCOPE_RE = re.compile(r"/subscriptions/([^/?]+)", re.IGNORECASE)
+_MANAGEMENT_GROUP_SCOPE_RE = re.compile(r"/managementGroups/([^/?]+)", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+# Remaining quota at or below this share of the largest value seen for a header
+# counts as "running low" and slows the bucket down.
+_LOW_REMAINING_RATIO = 0.1
+_INCREASE_STEP = 0.1
+_LOW_REMAINING_FACTOR = 0.75
+_THROTTLE_FACTOR = 0.5
+
+
+def retry_after_seconds(headers, default=2.0):
+    """Return the first parseable retry-after value from Azure rate-limit headers."""
+    for name in RETRY_AFTER_HEADERS:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            continue
+    return default
+
+
+def _remaining_values(headers):
+    """Yield (header, remaining) for every x-ms-ratelimit remaining-quota header."""
+    for name, value in headers.items():
+        lowered = name.lower()
+        if not lowered.startswith("x-ms-ratelimit") or "remaining" not in lowered:
+            continue
+        # QPU headers look like "QueryResource=11"; ARM read headers are plain integers.
+        match = _NUMBER_RE.search(str(value).split("=")[-1])
+        if match:
+            yield lowered, float(match.group())
+
+
+def scopes_for_request(url, payload=None):
+    """Return the rate-limit scopes (most specific first) a request counts against."""
+    scope_path = (payload or {}).get("scope") or url
+    match = _MANAGEMENT_GROUP_SCOPE_RE.search(scope_path)
+    if match:
+        return (f"managementGroup:{match.group(1).lower()}", TENANT_SCOPE)
+    match = _SUBSCRIPTION_SCOPE_RE.search(scope_path)
+    if match:
+        return (f"subscription:{match.group(1).lower()}", TENANT_SCOPE)
+    return (TENANT_SCOPE,)
+
+
+class TokenBucket:
+    """Token bucket whose refill rate is tuned from observed quota headers."""
+
+    def __init__(self, rate, capacity, min_rate, max_rate, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._max_remaining = {}
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self):
+        """Take one token and return how many seconds the caller must wait for it."""
+        now = self._clock()
+        self._refill(now)
+        self._tokens -= 1
+        wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        return max(wait, self._paused_until - now)
+
+    def throttle(self, retry_after):
+        now = self._clock()
+        self._refill(now)
+        self.rate = max(self.min_rate, self.rate * _THROTTLE_FACTOR)
+        self._tokens = min(self._tokens, 0.0)
+        self._paused_until = max(self._paused_until, now + retry_after)
+
+    def observe_remaining(self, header, remaining):
+        peak = max(self._max_remaining.get(header, 0.0), remaining)
+        self._max_remaining[header] = peak
+        if remaining <= peak * _LOW_REMAINING_RATIO:
+            self.rate = max(self.min_rate, self.rate * _LOW_REMAINING_FACTOR)
+            return False
+        return True
+
+    def relax(self):
+        self.rate = min(self.max_rate, self.rate + _INCREASE_STEP)
+
+
+class AdaptiveRateLimiter:
+    """
+    Per-scope token buckets (tenant, subscription, management group).
+
+    Every response feeds back into the buckets: 429s halve the rate and pause
+    the bucket for the advertised retry-after, low remaining quota slows it,
+    and healthy responses raise it step by step up to the configured ceiling.
+    """
+
+    def __init__(
+        self,
+        initial_rate=COST_API_INITIAL_RATE,
+        min_rate=COST_API_MIN_RATE,
+        max_rate=COST_API_MAX_RATE,
+        burst=COST_API_BURST,
+        clock=time.monotonic,
+    ):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self._clock = clock
+        self._buckets = {}
+
+    def bucket(self, scope):
+        bucket = self._buckets.get(scope)
+        if bucket is None:
+            bucket = TokenBucket(
+                self.initial_rate, self.burst, self.min_rate, self.max_rate, clock=self._clock
+            )
+            self._buckets[scope] = bucket
+        return bucket
+
+    def known_rate(self, scope):
+        """Current rate of a scope's bucket, or None if nothing has used that scope yet."""
+        bucket = self._buckets.get(scope)
+        return bucket.rate if bucket else None
+
+    def reserve(self, scopes):
+        return max(self.bucket(scope).reserve() for scope in scopes)
+
+    async def acquire(self, scopes):
+        wait = self.reserve(scopes)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def observe(self, scopes, status_code, headers):
+        scope_bucket = self.bucket(scopes[0])
+
+        if status_code == 429:
+            retry_after = retry_after_seconds(headers)
+            scope_bucket.throttle(retry_after)
+            if _TENANT_RETRY_AFTER_HEADER in headers and scopes[0] != TENANT_SCOPE:
+                self.bucket(TENANT_SCOPE).throttle(retry_after)
+            logger.info(
+                f"Rate limiter backing off scope={scopes[0]} to {scope_bucket.rate:.2f} req/s"
+            )
+            return
+
+        healthy = True
+        for header, remaining in _remaining_values(headers):
+            target = self.bucket(TENANT_SCOPE) if "tenant" in header else scope_bucket
+            healthy = target.observe_remaining(header, remaining) and healthy
+        if healthy and status_code < 400:
+            for scope in scopes:
+                self.bucket(scope).relax()
+
+
+rate_limiter = AdaptiveRateLimiter()
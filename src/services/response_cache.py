@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from src.config import (
+    COST_CACHE_DIR,
+    COST_CACHE_ENABLED,
+    COST_CACHE_MAX_AGE_SEC,
+    COST_CACHE_METADATA_TTL_SEC,
+    COST_CACHE_SETTLE_DAYS,
+    COST_CACHE_TTL_SEC,
+)
+from src.utils import clock
+from src.utils.logger import logger
+
+# Set on responses served from an expired entry because Azure could not be reached.
+STALE_AS_OF_KEY = "_staleAsOf"
+
+
+def _digest(material):
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def cache_key(url, payload=None):
+    """
+    Key entries by scope URL, query shape and range start.
+
+    timePeriod.to is left out: open-period queries end today, so keying on it
+    would start a new entry every day and leave no last-known-good response
+    to fall back on. Each query keeps one entry that is overwritten instead.
+    """
+    payload = payload or {}
+    time_period = payload.get("timePeriod")
+    if time_period:
+        payload = {**payload, "timePeriod": {name: value for name, value in time_period.items() if name != "to"}}
+    return _digest({"url": url, "payload": payload})
+
+
+def request_fingerprint(url, payload=None):
+    """Identify the exact request, so an entry is only a fresh hit for the range it was fetched for."""
+    return _digest({"url": url, "payload": payload or {}})
+
+
+def ttl_for_request(query_type, payload=None, today=None):
+    """
+    Return the entry lifetime in seconds, or None to keep it indefinitely.
+
+    Actual-cost ranges that ended before the settle window are closed and
+    never change; anything touching recent days (and every forecast) expires
+    quickly. Metadata lookups use their own longer TTL.
+    """
+    if payload is None:
+        return COST_CACHE_METADATA_TTL_SEC
+
+    period_end = (payload.get("timePeriod") or {}).get("to")
+    if query_type != "forecast" and period_end:
+        today = today or clock.now()
+        settled_before = (today - timedelta(days=COST_CACHE_SETTLE_DAYS)).strftime("%Y-%m-%d")
+        if period_end[:10] < settled_before:
+            return None
+    return COST_CACHE_TTL_SEC
+
+
+class ResponseCache:
+    """Gzipped JSON response cache on disk with per-entry expiry and age-based pruning."""
+
+    def __init__(self, cache_dir=COST_CACHE_DIR, enabled=COST_CACHE_ENABLED):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json.gz")
+
+    def get(self, key):
+        """Return the stored entry (fresh or expired) or None."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def put(self, key, response, ttl, request=None):
+        if not self.enabled:
+            return
+        stored_at = time.time()
+        entry = {
+            "stored_at": stored_at,
+            "expires_at": None if ttl is None else stored_at + ttl,
+            "request": request,
+            "response": response,
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as file:
+                json.dump(entry, file)
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {key}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def prune(self, max_age=COST_CACHE_MAX_AGE_SEC):
+        """
+        Delete entries (and abandoned temp files) not written for max_age
+        seconds, so expired responses and nextLink pages of past runs do not
+        pile up. A max_age of 0 keeps everything.
+        """
+        if not self.enabled or not max_age or not os.path.isdir(self.cache_dir):
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith((".json.gz", ".tmp")):
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError as e:
+                    logger.warning(f"Failed to prune cache entry {entry.path}: {e}")
+        if removed:
+            logger.info(f"Pruned {removed} response cache entries older than {max_age:.0f}s")
+        return removed
+
+    @staticmethod
+    def is_fresh(entry, request=None):
+        """True when the entry has not expired and (given a fingerprint) was fetched for that exact request."""
+        if request is not None and entry.get("request") != request:
+            return False
+        return entry["expires_at"] is None or time.time() < entry["expires_at"]
+
+    @staticmethod
+    def stale_response(entry):
+        """Return the cached response marked with when it was last known good."""
+        response = entry["response"]
+        if not isinstance(response, dict):
+            return response
+        as_of = datetime.fromtimestamp(entry["stored_at"]).strftime("%Y-%m-%d %H:%M")
+        return {**response, STALE_AS_OF_KEY: as_of}
+
+
+class DataStatus:
+    """Tracks whether any page behind a report entry came from a stale cache entry."""
+
+    def __init__(self):
+        self.stale_as_of = None
+
+    @staticmethod
+    def unavailable(reason):
+        """Status for an entry whose data could not be fetched at all (failure or deadline)."""
+        return {"state": "unavailable", "as_of": None, "reason": reason}
+
+    def observe(self, page):
+        as_of = (page or {}).get(STALE_AS_OF_KEY)
+        if as_of and (self.stale_as_of is None or as_of < self.stale_as_of):
+            self.stale_as_of = as_of
+        return page
+
+    def to_dict(self):
+        return {"state": "stale" if self.stale_as_of else "fresh", "as_of": self.stale_as_of}
+
+
+response_cache = ResponseCache()
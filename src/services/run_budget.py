@@ -0,0 +1,47 @@
+import time
+from datetime import datetime, timedelta
+
+from src.config import RUN_DEADLINE_SEC, SUBSCRIPTION_TIMEOUT_SEC
+
+
+def parse_deadline(value, now=None):
+    """
+    Convert a --deadline value into seconds from now.
+
+    Accepts a number of seconds ("5400") or a local wall-clock time ("08:00"),
+    which means its next occurrence.
+    """
+    value = str(value).strip()
+    if ":" not in value:
+        return max(0.0, float(value))
+
+    now = now or datetime.now()
+    clock = datetime.strptime(value, "%H:%M")
+    target = now.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+class RunBudget:
+    """Wall-clock budget for one report run, split into per-subscription timeouts."""
+
+    def __init__(self, deadline_sec=RUN_DEADLINE_SEC, subscription_timeout_sec=SUBSCRIPTION_TIMEOUT_SEC, clock=time.monotonic):
+        self._clock = clock
+        self.deadline_at = None if deadline_sec is None else clock() + deadline_sec
+        self.subscription_timeout_sec = subscription_timeout_sec
+
+    def remaining(self):
+        """Seconds left in the run, or None when there is no deadline."""
+        if self.deadline_at is None:
+            return None
+        return max(0.0, self.deadline_at - self._clock())
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def subscription_timeout(self):
+        """Time a subscription may take if it starts now: its own timeout capped by the run deadline."""
+        limits = [limit for limit in (self.remaining(), self.subscription_timeout_sec) if limit is not None]
+        return min(limits) if limits else None
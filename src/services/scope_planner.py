@@ -0,0 +1,227 @@
+import json
+import math
+import os
+import statistics
+import tempfile
+
+from src.config import (
+    COST_API_MAX_CONCURRENT,
+    COST_AUTO_OUTLIER_FACTOR,
+    COST_PLANNER_STATS_PATH,
+    COST_SCOPE_FILTER_BATCH_SIZE,
+    MANAGEMENT_GROUP_ID,
+)
+from src.services.azure_cost import plan_actual_cost_queries
+from src.services.rate_limiter import TENANT_SCOPE, rate_limiter
+from src.utils.logger import logger
+from src.utils.utils import get_report_period_dates
+
+# Rows per Cost Management result page, and defaults used before any run has been recorded.
+PAGE_ROWS = 5000
+DEFAULT_ROWS_PER_SUBSCRIPTION = 1500
+DEFAULT_REQUEST_SEC = 1.5
+ROW_SEC = 0.00002
+
+
+class ScopeRunStats:
+    """
+    Per-run figures the scope planner learns from, persisted as JSON.
+
+    Records rows and wall time per subscription, which configured
+    subscriptions the management group does not contain, and the tenant
+    request rate the limiter settled on.
+    """
+
+    def __init__(self, path=COST_PLANNER_STATS_PATH):
+        self.path = path
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._load()
+        return self._data
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {"subscriptions": {}, "management_group": {}}
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable planner stats {self.path}: {e}")
+            return {"subscriptions": {}, "management_group": {}}
+        data.setdefault("subscriptions", {})
+        data.setdefault("management_group", {})
+        return data
+
+    def subscription(self, subscription_id):
+        return self.data["subscriptions"].get(subscription_id.strip().lower(), {})
+
+    def record_subscription(self, subscription_id, rows, seconds):
+        self.data["subscriptions"][subscription_id.strip().lower()] = {"rows": rows, "seconds": round(seconds, 3)}
+
+    def record_management_group(self, management_group_id, rows_by_subscription, seconds, missing):
+        self.data["management_group"] = {
+            "id": management_group_id,
+            "rows": sum(rows_by_subscription.values()),
+            "seconds": round(seconds, 3),
+            "missing": sorted(sub_id.strip().lower() for sub_id in missing),
+        }
+        for sub_key, rows in rows_by_subscription.items():
+            # Row counts carry over to per-subscription estimates; MG wall time does not.
+            self.data["subscriptions"].setdefault(sub_key, {})["rows"] = rows
+
+    def missing_from_management_group(self, management_group_id):
+        group = self.data["management_group"]
+        return set(group.get("missing", [])) if group.get("id") == management_group_id else set()
+
+    def record_tenant_rate(self, rate):
+        self.data["tenant_rate"] = rate
+
+    def save(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(self.data, file, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save planner stats {self.path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+class PlanEstimate:
+    def __init__(self, requests, rows, seconds):
+        self.requests = requests
+        self.rows = rows
+        self.seconds = seconds
+
+    def __add__(self, other):
+        return PlanEstimate(self.requests + other.requests, self.rows + other.rows, self.seconds + other.seconds)
+
+    def __repr__(self):
+        return f"~{self.requests} requests, ~{self.rows} rows, ~{self.seconds:.1f}s"
+
+
+class ScopePlan:
+    """Which subscriptions are fetched through the management group and which one by one."""
+
+    def __init__(self, name, management_group, per_subscription, estimate):
+        self.name = name
+        self.management_group = management_group
+        self.per_subscription = per_subscription
+        self.estimate = estimate
+
+    def describe(self):
+        return (
+            f"{self.name}: {len(self.management_group)} subscription(s) via management group, "
+            f"{len(self.per_subscription)} per subscription ({self.estimate})"
+        )
+
+
+def _queries_per_scope(today=None):
+    """Logical queries one scope needs: the planned actual-cost segments plus the forecast."""
+    return len(plan_actual_cost_queries(get_report_period_dates(today))) + 1
+
+
+class ScopePlanner:
+    """
+    Estimates request count, row volume and wall time of the per-subscription
+    and management-group strategies, and picks the cheapest (possibly mixed) plan.
+
+    Row volumes and request latency come from past-run stats, pacing from the
+    limiter's current tenant rate, and each row adds a transfer and parse cost.
+    """
+
+    def __init__(self, stats, management_group_id=MANAGEMENT_GROUP_ID, queries_per_scope=None):
+        self.stats = stats
+        self.management_group_id = management_group_id
+        self.queries_per_scope = queries_per_scope or _queries_per_scope()
+
+    def _rows(self, subscription_id):
+        return self.stats.subscription(subscription_id).get("rows", DEFAULT_ROWS_PER_SUBSCRIPTION)
+
+    def _scope_requests(self, rows):
+        # Every result page beyond the first is one more request.
+        return self.queries_per_scope + max(0, math.ceil(rows / PAGE_ROWS) - 1)
+
+    def _latency(self):
+        latencies = [
+            entry["seconds"] / self._scope_requests(entry.get("rows", 0))
+            for entry in self.stats.data["subscriptions"].values()
+            if entry.get("seconds")
+        ]
+        return statistics.median(latencies) if latencies else DEFAULT_REQUEST_SEC
+
+    def _estimate(self, parallel_requests, sequential_requests, rows):
+        """
+        Independent queries share COST_API_MAX_CONCURRENT slots; nextLink pages
+        of one query are fetched back to back. Both are paced by the tenant rate.
+        """
+        rate = rate_limiter.known_rate(TENANT_SCOPE) or self.stats.data.get("tenant_rate") or rate_limiter.initial_rate
+        latency = self._latency()
+        seconds = (
+            parallel_requests * max(1.0 / rate, latency / COST_API_MAX_CONCURRENT)
+            + sequential_requests * max(1.0 / rate, latency)
+            + rows * ROW_SEC
+        )
+        return PlanEstimate(parallel_requests + sequential_requests, rows, seconds)
+
+    def estimate_per_subscription(self, subscription_ids):
+        # Long Daily ranges are chunked by month, so a subscription's pages run concurrently too.
+        requests = sum(self._scope_requests(self._rows(sub_id)) for sub_id in subscription_ids)
+        rows = sum(self._rows(sub_id) for sub_id in subscription_ids)
+        return self._estimate(requests, 0, rows)
+
+    def estimate_management_group(self, subscription_ids):
+        if not subscription_ids:
+            return PlanEstimate(0, 0, 0.0)
+        batches = math.ceil(len(subscription_ids) / COST_SCOPE_FILTER_BATCH_SIZE)
+        rows = sum(self._rows(sub_id) for sub_id in subscription_ids)
+        return self._estimate(batches * self.queries_per_scope, max(0, math.ceil(rows / PAGE_ROWS) - batches), rows)
+
+    def _outliers(self, subscription_ids):
+        """Subscriptions with far more rows than the rest, better fetched on their own."""
+        known = {sub_id: self.stats.subscription(sub_id).get("rows") for sub_id in subscription_ids}
+        known = {sub_id: rows for sub_id, rows in known.items() if rows}
+        if len(known) < 3:
+            return []
+        median_rows = statistics.median(known.values())
+        return [
+            sub_id
+            for sub_id, rows in known.items()
+            if rows > PAGE_ROWS and rows > COST_AUTO_OUTLIER_FACTOR * median_rows
+        ]
+
+    def plan(self, subscription_ids):
+        subscription_ids = [sub_id.strip() for sub_id in subscription_ids]
+        per_subscription = ScopePlan(
+            "per-subscription", [], subscription_ids, self.estimate_per_subscription(subscription_ids)
+        )
+        if not self.management_group_id:
+            return per_subscription
+
+        # Subscriptions found outside the management group last time are fetched directly.
+        missing = self.stats.missing_from_management_group(self.management_group_id)
+        outside = [sub_id for sub_id in subscription_ids if sub_id.lower() in missing]
+        inside = [sub_id for sub_id in subscription_ids if sub_id.lower() not in missing]
+
+        candidates = [per_subscription]
+        if inside:
+            candidates.append(self._mixed_plan("management-group", inside, outside))
+            outliers = self._outliers(inside)
+            if outliers:
+                bulk = [sub_id for sub_id in inside if sub_id not in outliers]
+                candidates.append(self._mixed_plan("mixed", bulk, outside + outliers))
+
+        return min(candidates, key=lambda plan: plan.estimate.seconds)
+
+    def _mixed_plan(self, name, management_group, per_subscription):
+        estimate = self.estimate_management_group(management_group) + self.estimate_per_subscription(per_subscription)
+        return ScopePlan(name, management_group, per_subscription, estimate)
+
+
+scope_run_stats = ScopeRunStats()
@@ -0,0 +1,47 @@
+import asyncio
+import hashlib
+import json
+
+
+def request_key(url, payload=None):
+    """Build a single-flight key from the request URL and a stable payload hash."""
+    if payload is None:
+        return url, None
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return url, hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls onto one in-flight task.
+
+    Callers that arrive while a call for the same key is running await the
+    shared result instead of issuing their own request. Results are shared by
+    reference and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+
+    async def do(self, key, factory):
+        loop = asyncio.get_running_loop()
+        entry = self._in_flight.get(key)
+        if entry is None or entry[0] is not loop:
+            task = loop.create_task(factory())
+            entry = (loop, task)
+            self._in_flight[key] = entry
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+
+        # Shield the shared task so one caller's cancellation does not cancel the others.
+        return await asyncio.shield(entry[1])
+
+    def _forget(self, key, task):
+        entry = self._in_flight.get(key)
+        if entry is not None and entry[1] is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every waiter was cancelled.
+            task.exception()
+
+
+azure_single_flight = SingleFlight()
@@ -23,7 +23,12 @@ def render_markdown_summary(final_data):
         daily = f"{currency_symbol}{sub.get('daily_cost', 0.0):,.2f}"
         mtd = f"{currency_symbol}{sub.get('month_to_day', 0.0):,.2f}"
         forecast = f"{currency_symbol}{sub.get('month_forecast', 0.0):,.2f}"
-        markdown_lines.append(f"| **{sub_name}** | {daily} | {mtd} | {forecast} |")
+        status = sub.get("data_status") or {}
+        stale_note = f" _(stale as of {status.get('as_of')})_" if status.get("state") == "stale" else ""
+        if status.get("state") == "unavailable":
+            stale_note = " _(data unavailable)_"
+            daily = mtd = forecast = "n/a"
+        markdown_lines.append(f"| **{sub_name}**{stale_note} | {daily} | {mtd} | {forecast} |")
         
     markdown_lines.extend(["", "---", "", "#### 🔍 Service Cost Breakdown (MTD)"])
     
@@ -34,10 +39,12 @@ def render_markdown_summary(final_data):
         if not breakdown:
             markdown_lines.append("- No service breakdown data available.")
         else:
-            for item in breakdown[:5]:  # Top 5 services
+            services = [item for item in breakdown if not item.get("other_count")]
+            for item in services[:5]:  # Top 5 services
                 markdown_lines.append(f"- {item['service']}: {item['cost']}")
-            if len(breakdown) > 5:
-                markdown_lines.append(f"- *And {len(breakdown) - 5} other services...*")
+            hidden = len(services[5:]) + sum(item.get("other_count", 0) for item in breakdown)
+            if hidden:
+                markdown_lines.append(f"- *And {hidden} other services...*")
                 
     return "\n".join(markdown_lines)
 
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+_frozen_now = None
+
+
+def now():
+    """Current local time, or the frozen moment while a recorded run is being replayed."""
+    return _frozen_now or datetime.now()
+
+
+def freeze(moment):
+    global _frozen_now
+    _frozen_now = moment
+
+
+def unfreeze():
+    freeze(None)
@@ -0,0 +1,51 @@
+"""
+Fixed-point money arithmetic shared by the cost aggregators and breakdowns.
+
+Amounts are held as integers scaled by SCALE (1e-8 of a currency unit), so
+sums are exact and independent of row order. Values are rounded to cents
+(ROUND_HALF_UP) only when a report figure is produced.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+SCALE = 10**8
+CENT = Decimal("0.01")
+
+
+def to_units(value) -> int:
+    """Convert a cost (float, int, Decimal or numeric string) to scaled integer units."""
+    if isinstance(value, float):
+        return round(value * SCALE)
+    if isinstance(value, int):
+        return value * SCALE
+    return int((Decimal(str(value)) * SCALE).to_integral_value())
+
+
+def to_decimal(units: int) -> Decimal:
+    """Exact Decimal value of scaled integer units."""
+    return Decimal(units).scaleb(-8)
+
+
+def to_cents(units: int) -> Decimal:
+    """Round scaled integer units to a 2 dp Decimal."""
+    return to_decimal(units).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class MoneyAccumulator:
+    """Exact running total of costs in scaled integer units."""
+
+    __slots__ = ("units",)
+
+    def __init__(self, units: int = 0):
+        self.units = units
+
+    def add(self, value):
+        self.units += to_units(value)
+
+    def add_units(self, units: int):
+        self.units += units
+
+    def decimal(self) -> Decimal:
+        return to_decimal(self.units)
+
+    def cents(self) -> Decimal:
+        return to_cents(self.units)
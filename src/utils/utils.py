@@ -1,8 +1,13 @@
-import asyncio
+import heapq
 from datetime import datetime, timedelta
-from decimal import ROUND_HALF_UP, Decimal
+from decimal import Decimal
 
 from src.services.azure_billing import get_billing_period
+from src.utils import clock, money
+from src.utils.money import MoneyAccumulator
+
+# Label of the row the long tail of services is folded into.
+OTHER_SERVICES = "Other services"
 
 CURRENCY_SYMBOLS = {
     "USD": "$",
@@ -36,21 +41,16 @@ def format_currency(value, currency_symbol="$"):
         return value
 
 
-async def get_forecast_month_date(subscription_id: str, access_token=None):
-    """Fetch billing boundaries and return report date ranges."""
-    today = datetime.now()
+def get_report_run_dates(today=None):
+    """Return the report's run date and reporting day without any billing lookups."""
+    today = today or clock.now()
     yesterday = today - timedelta(days=2)
+    return {"today": today.strftime("%Y-%m-%d"), "yesterday": yesterday.strftime("%Y-%m-%d")}
 
-    loop = asyncio.get_running_loop()
-    last_billing_start_day, _ = await loop.run_in_executor(
-        None, get_billing_period, subscription_id, access_token
-    )
 
-    start_day = (
-        datetime.strptime(last_billing_start_day, "%Y-%m-%d").day
-        if last_billing_start_day
-        else 1
-    )
+def get_report_period_dates(today=None, start_day=1):
+    """Return the run dates plus the billing month and year that contain them."""
+    today = today or clock.now()
 
     month_starts_on = (
         today.replace(day=start_day)
@@ -67,8 +67,7 @@ async def get_forecast_month_date(subscription_id: str, access_token=None):
     year_ends_on = datetime(year_starts_on.year + 1, 1, start_day) - timedelta(days=1)
 
     return {
-        "today": today.strftime("%Y-%m-%d"),
-        "yesterday": yesterday.strftime("%Y-%m-%d"),
+        **get_report_run_dates(today),
         "month_starts_on": month_starts_on.strftime("%Y-%m-%d"),
         "month_ends_on": month_ends_on.strftime("%Y-%m-%d"),
         "year_starts_on": year_starts_on.strftime("%Y-%m-%d"),
@@ -76,47 +75,88 @@ async def get_forecast_month_date(subscription_id: str, access_token=None):
     }
 
 
-def calculate_cost(data):
-    total_cost = sum(
-        (
-            Decimal(str(item[0]))
-            for item in data.get("properties", {}).get("rows", [])
-            if isinstance(item[0], (int, float))
-        ),
-        Decimal("0.0"),
+async def get_forecast_month_date(subscription_id: str, access_token=None):
+    """Fetch billing boundaries and return report date ranges."""
+    last_billing_start_day, _ = await get_billing_period(subscription_id, access_token)
+
+    start_day = (
+        datetime.strptime(last_billing_start_day, "%Y-%m-%d").day
+        if last_billing_start_day
+        else 1
     )
-    return total_cost.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return get_report_period_dates(clock.now(), start_day)
+
+
+def calculate_cost(data):
+    total_cost = MoneyAccumulator()
+    for item in data.get("properties", {}).get("rows", []):
+        if isinstance(item[0], (int, float)):
+            total_cost.add(item[0])
+    return total_cost.cents()
+
+
+def _breakdown_units(cost):
+    return money.to_units(cost) if isinstance(cost, (int, float, Decimal)) else None
+
 
+def get_cost_breakdown(cost_data, top_n=None):
+    """
+    Return (service rows sorted by cost, formatted total).
 
-def get_cost_breakdown(cost_data):
+    With top_n, only the top_n most expensive services are selected (with a
+    heap, so the long tail is never sorted or formatted) and the rest are
+    folded into one "Other services" row. The total always covers every row.
+    """
     breakdown = []
-    total_cost = 0.0
+    total_cost = MoneyAccumulator()
 
-    rows = cost_data.get("properties", {}).get("rows", [])
+    rows = [item for item in cost_data.get("properties", {}).get("rows", []) if len(item) >= 4]
 
     currency_code = "USD"
     for item in rows:
-        if len(item) >= 4 and item[3]:
+        if item[3]:
             currency_code = item[3]
             break
 
     currency_symbol = get_currency_symbol(currency_code)
-    sorted_rows = sorted(rows, key=lambda x: float(x[0]), reverse=True)
-
-    for item in sorted_rows:
-        if len(item) < 4:
-            continue
-
+    if top_n and len(rows) > top_n:
+        top = set(heapq.nlargest(top_n, range(len(rows)), key=lambda index: float(rows[index][0])))
+        selected = [item for index, item in enumerate(rows) if index in top]
+        other = MoneyAccumulator()
+        for index, item in enumerate(rows):
+            if index not in top:
+                units = _breakdown_units(item[0])
+                other.add_units(units or 0)
+        other_count = len(rows) - len(top)
+    else:
+        selected, other, other_count = rows, None, 0
+
+    for item in sorted(selected, key=lambda x: float(x[0]), reverse=True):
         cost, _, service_name, currency = item[:4]
-        total_cost += cost if isinstance(cost, (int, float)) else 0
+        units = _breakdown_units(cost)
+        if units is not None:
+            total_cost.add_units(units)
 
         breakdown.append(
             {
                 "service": service_name,
-                "cost": format_currency(cost, currency_symbol),
-                "raw_cost": float(cost) if isinstance(cost, (int, float)) else 0.0,
+                # Rounded the same way as the report totals, so rows add up to them.
+                "cost": format_currency(money.to_cents(units) if units is not None else cost, currency_symbol),
+                "raw_cost": float(money.to_decimal(units)) if units is not None else 0.0,
                 "currency": currency,
             }
         )
 
-    return breakdown, format_currency(total_cost, currency_symbol)
+    if other is not None:
+        total_cost.add_units(other.units)
+        breakdown.append(
+            {
+                "service": OTHER_SERVICES,
+                "cost": format_currency(other.cents(), currency_symbol),
+                "raw_cost": float(other.decimal()),
+                "currency": currency_code,
+                "other_count": other_count,
+            }
+        )
+
+    return breakdown, format_currency(total_cost.cents(), currency_symbol)
@@ -52,3 +52,47 @@ def test_get_cost_breakdown_eur():
     breakdown, total = get_cost_breakdown(mock_data)
     assert breakdown[0]["cost"] == "€30.50"
     assert total == "€30.50"
+
+def test_money_accumulator_is_exact_and_order_independent():
+    from src.utils.money import MoneyAccumulator
+
+    forward, backward = MoneyAccumulator(), MoneyAccumulator()
+    costs = [0.1] * 10 + [1e7, 0.005, -1e7]
+    for cost in costs:
+        forward.add(cost)
+    for cost in reversed(costs):
+        backward.add(cost)
+
+    assert forward.units == backward.units
+    assert forward.decimal() == Decimal("1.005")
+    assert forward.cents() == Decimal("1.01")
+
+def test_get_cost_breakdown_rounds_like_report_totals():
+    mock_data = {
+        "properties": {
+            "rows": [
+                [0.125, "2026-06-18", "Virtual Machines", "USD"],
+                [0.1, "2026-06-18", "Storage Accounts", "USD"],
+                [0.2, "2026-06-18", "Key Vault", "USD"],
+            ]
+        }
+    }
+    breakdown, total = get_cost_breakdown(mock_data)
+    assert breakdown[1]["cost"] == "$0.13"
+    assert breakdown[1]["raw_cost"] == 0.125
+    assert total == "$0.43"
+    assert calculate_cost(mock_data) == Decimal("0.43")
+
+def test_get_cost_breakdown_folds_long_tail_into_other_services():
+    rows = [[float(cost), "2026-06-18", f"Service {cost}", "USD"] for cost in range(1, 91)]
+    rows.append([0.005, "2026-06-18", "Tiny", "USD"])
+    mock_data = {"properties": {"rows": rows}}
+
+    breakdown, total = get_cost_breakdown(mock_data, top_n=3)
+    _, full_total = get_cost_breakdown(mock_data)
+
+    assert [item["service"] for item in breakdown] == ["Service 90", "Service 89", "Service 88", "Other services"]
+    assert breakdown[-1]["other_count"] == 88
+    assert breakdown[-1]["cost"] == "$3,828.01"
+    assert total == full_total == "$4,095.01"
+    assert len(get_cost_breakdown(mock_data, top_n=0)[0]) == 91
@@ -0,0 +1,216 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+
+MOCK_DATES = {
+    "today": "2026-06-20",
+    "yesterday": "2026-06-18",
+    "month_starts_on": "2026-06-01",
+    "month_ends_on": "2026-06-30",
+    "year_starts_on": "2026-01-01",
+    "year_ends_on": "2026-12-31",
+}
+
+
+async def _collect_rows(pages):
+    return [row async for page in pages for row in page["properties"]["rows"]]
+
+
+def test_long_daily_query_is_chunked_by_month_and_retries_only_failed_chunks():
+    from src.services.azure_cost import iter_cost_data
+
+    requested = []
+    failed_once = set()
+
+    async def fake_call(url, token, payload, subscription_id, query_type):
+        period = payload["timePeriod"]
+        requested.append((period["from"], period["to"]))
+        if period["from"] == "2026-02-01" and "feb" not in failed_once:
+            failed_once.add("feb")
+            raise httpx.ConnectError("transient")
+        await asyncio.sleep(0.03 if period["from"] == "2026-01-15" else 0.01)
+        return {"properties": {"rows": [[1.0, period["from"]]]}}
+
+    with patch("src.services.azure_cost.MOCK_AZURE", False), \
+         patch("src.services.azure_cost._CHUNK_RETRY_BACKOFF_SEC", 0), \
+         patch("src.services.azure_cost._throttled_cost_api_call", side_effect=fake_call):
+        rows = asyncio.run(_collect_rows(iter_cost_data("token", "2026-01-15", "2026-03-10", "sub", query="query", granularity="Daily")))
+
+    assert [row[1] for row in rows] == ["2026-01-15", "2026-02-01", "2026-03-01"]
+    assert sorted(requested) == [
+        ("2026-01-15", "2026-01-31"),
+        ("2026-02-01", "2026-02-28"),
+        ("2026-02-01", "2026-02-28"),
+        ("2026-03-01", "2026-03-10"),
+    ]
+
+
+def test_subscription_names_resolved_from_one_paged_listing():
+    from src.services import azure_cost
+
+    pages = {
+        "https://example.test/subscriptions?api-version=2020-01-01": {
+            "value": [
+                {"subscriptionId": "SUB-A", "displayName": "Alpha"},
+                {"subscriptionId": "sub-x", "displayName": "Unrelated"},
+            ],
+            "nextLink": "https://example.test/subscriptions?page=2",
+        },
+        "https://example.test/subscriptions?page=2": {
+            "value": [{"subscriptionId": "sub-b", "displayName": "Beta"}],
+        },
+    }
+    requested = []
+
+    async def fake_call(url, token, payload, subscription_id, query_type):
+        requested.append(url)
+        return pages[url]
+
+    with patch("src.services.azure_cost.MOCK_AZURE", False), \
+         patch("src.services.azure_cost.BASE_URL", "https://example.test"), \
+         patch.dict(azure_cost._subscription_names, clear=True), \
+         patch("src.services.azure_cost._throttled_cost_api_call", side_effect=fake_call):
+        names = asyncio.run(azure_cost.get_subscription_names(["sub-a", "sub-b"], "token"))
+        cached_name = asyncio.run(azure_cost.get_subscription_name("sub-b", "token"))
+
+    assert names == {"sub-a": "Alpha", "sub-b": "Beta"}
+    assert cached_name == "Beta"
+    assert requested == list(pages)
+
+
+def _status_error(status):
+    request = httpx.Request("POST", "https://example.test/q")
+    return httpx.HTTPStatusError(str(status), request=request, response=httpx.Response(status, request=request))
+
+
+@pytest.mark.parametrize("error", [_status_error(403), _status_error(400), ValueError("bad rows")])
+def test_chunk_errors_that_are_not_transient_are_not_retried(error):
+    from src.services.azure_cost import iter_cost_data
+
+    requested = []
+
+    async def fake_call(url, token, payload, subscription_id, query_type):
+        requested.append(payload["timePeriod"]["from"])
+        if payload["timePeriod"]["from"] == "2026-02-01":
+            raise error
+        return {"properties": {"rows": []}}
+
+    with patch("src.services.azure_cost.MOCK_AZURE", False), \
+         patch("src.services.azure_cost._CHUNK_RETRY_BACKOFF_SEC", 0), \
+         patch("src.services.azure_cost._throttled_cost_api_call", side_effect=fake_call):
+        with pytest.raises(type(error)):
+            asyncio.run(_collect_rows(iter_cost_data("token", "2026-01-15", "2026-03-10", "sub", query="query", granularity="Daily")))
+
+    assert requested.count("2026-02-01") == 1
+
+
+def test_chunked_pages_stream_one_at_a_time_and_are_not_restarted_midway():
+    from src.services.azure_cost import iter_cost_data
+
+    next_link = "https://example.test/next?$skiptoken=2"
+    requested = []
+
+    async def fake_call(url, token, payload, subscription_id, query_type):
+        start = payload["timePeriod"]["from"]
+        requested.append((start, url))
+        if start == "2026-01-15" and url == next_link:
+            raise _status_error(503)
+        if start == "2026-01-15":
+            return {"properties": {"rows": [[1.0, start]], "nextLink": next_link}}
+        return {"properties": {"rows": [[2.0, start]]}}
+
+    async def run():
+        received = []
+        with pytest.raises(httpx.HTTPStatusError):
+            async for page in iter_cost_data("token", "2026-01-15", "2026-02-10", "sub", query="query", granularity="Daily"):
+                received.append(page["properties"]["rows"])
+        return received
+
+    with patch("src.services.azure_cost.MOCK_AZURE", False), \
+         patch("src.services.azure_cost._CHUNK_RETRY_BACKOFF_SEC", 0), \
+         patch("src.services.azure_cost._throttled_cost_api_call", side_effect=fake_call):
+        received = asyncio.run(run())
+
+    assert received == [[[1.0, "2026-01-15"]]]
+    assert [start for start, _ in requested].count("2026-01-15") == 2
+
+
+def test_chunk_still_throttled_after_request_retries_is_restarted():
+    import json
+
+    from src.services.azure_cost import iter_cost_data
+    from src.services.rate_limiter import AdaptiveRateLimiter
+    from src.services.response_cache import ResponseCache
+
+    throttled = {"2026-02-01": 8}
+    requested = []
+
+    def handler(request):
+        start = json.loads(request.content)["timePeriod"]["from"]
+        requested.append(start)
+        if throttled.get(start):
+            throttled[start] -= 1
+            return httpx.Response(429, headers={"x-ms-ratelimit-microsoft.costmanagement-entity-retry-after": "0"})
+        return httpx.Response(200, json={"properties": {"rows": [[1.0, start]]}})
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            with patch("src.services.azure_cost.get_http_client", return_value=client), \
+                 patch("src.services.azure_cost.rate_limiter", AdaptiveRateLimiter(initial_rate=1000, max_rate=1000, burst=100)), \
+                 patch("src.services.azure_cost.response_cache", ResponseCache(enabled=False)), \
+                 patch("src.services.azure_cost._retry_delay", return_value=0):
+                return await _collect_rows(
+                    iter_cost_data("token", "2026-01-15", "2026-02-10", "sub", query="query", granularity="Daily")
+                )
+        finally:
+            await client.aclose()
+
+    with patch("src.services.azure_cost.MOCK_AZURE", False), \
+         patch("src.services.azure_cost._CHUNK_RETRY_BACKOFF_SEC", 0):
+        rows = asyncio.run(run())
+
+    assert [row[1] for row in rows] == ["2026-01-15", "2026-02-01"]
+    assert requested.count("2026-02-01") == 9
+
+
+def test_hybrid_plan_keeps_partial_leading_month_and_yesterday_daily():
+    from src.services.azure_cost import plan_actual_cost_queries
+
+    dates = {
+        **MOCK_DATES,
+        "today": "2026-06-01",
+        "yesterday": "2026-05-30",
+        "month_starts_on": "2026-05-15",
+        "year_starts_on": "2026-01-15",
+    }
+
+    assert plan_actual_cost_queries(dates) == [
+        ("2026-01-15", "2026-01-31", "Daily"),
+        ("2026-02-01", "2026-04-30", "Monthly"),
+        ("2026-05-01", "2026-06-01", "Daily"),
+    ]
+
+
+def test_monthly_and_daily_segments_derive_the_same_metrics_as_a_full_daily_year():
+    from src.services.azure_cost import iter_cost_data, plan_actual_cost_queries
+    from src.services.cost_aggregator import DailyMetricsAccumulator, derive_metrics_from_daily_rows
+
+    async def run():
+        hybrid = DailyMetricsAccumulator(MOCK_DATES)
+        for start_date, end_date, granularity in plan_actual_cost_queries(MOCK_DATES):
+            hybrid.add_rows(await _collect_rows(
+                iter_cost_data("token", start_date, end_date, "sub-prod", granularity=granularity)
+            ))
+        daily = await _collect_rows(iter_cost_data(
+            "token", MOCK_DATES["year_starts_on"], MOCK_DATES["today"], "sub-prod", granularity="Daily"
+        ))
+        return hybrid.result(), derive_metrics_from_daily_rows(daily, MOCK_DATES)
+
+    with patch("src.services.azure_cost.MOCK_AZURE", True):
+        hybrid, daily = asyncio.run(run())
+
+    assert hybrid == daily
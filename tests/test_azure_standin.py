@@ -0,0 +1,166 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+
+from src.services.azure_standin import StandinSettings, create_standin_app
+from src.services.rate_limiter import AdaptiveRateLimiter
+from src.services.response_cache import ResponseCache
+
+
+def _run_against_standin(settings, coroutine_factory):
+    app = create_standin_app(settings)
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://standin")
+        try:
+            with patch("src.services.azure_cost.MOCK_AZURE", False), \
+                 patch("src.services.azure_cost.BASE_URL", "http://standin"), \
+                 patch("src.services.azure_cost.get_http_client", return_value=client), \
+                 patch("src.services.azure_cost.response_cache", ResponseCache(enabled=False)), \
+                 patch("src.services.azure_cost.rate_limiter", AdaptiveRateLimiter(initial_rate=1000, max_rate=1000, burst=100)), \
+                 patch("src.services.azure_cost._retry_delay", return_value=0):
+                return await coroutine_factory()
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run()), app.state.stats.snapshot()
+
+
+def test_client_pages_and_retries_against_standin():
+    from src.services.azure_cost import iter_cost_data
+
+    settings = StandinSettings(
+        subscriptions=["sub-a"],
+        services_per_subscription=20,
+        page_size=50,
+        throttle_every=3,
+        throttle_burst=1,
+        retry_after_sec=0,
+    )
+
+    async def collect_rows():
+        pages = iter_cost_data("token", "2026-06-01", "2026-06-10", "sub-a", granularity="Daily")
+        return [row async for page in pages for row in page["properties"]["rows"]]
+
+    rows, stats = _run_against_standin(settings, collect_rows)
+
+    assert len(rows) == 10 * 20
+    assert {row[2] for row in rows} == set(settings.service_names())
+    assert stats["throttled"] >= 1
+    assert stats["cost_requests"] == 4 + stats["throttled"]
+
+
+def test_standin_lists_subscriptions_with_next_link():
+    from src.services import azure_cost
+
+    settings = StandinSettings(subscriptions=["sub-a", "sub-b", "sub-c"], page_size=2)
+
+    with patch.dict(azure_cost._subscription_names, clear=True):
+        names, stats = _run_against_standin(
+            settings, lambda: azure_cost.get_subscription_names(["sub-a", "sub-c"], "token")
+        )
+
+    assert names == {"sub-a": "Stand-in sub-a", "sub-c": "Stand-in sub-c"}
+    assert stats["by_endpoint"] == {"subscriptions": 2}
+
+
+def test_streamed_pages_match_buffered_pages_against_standin():
+    from src.services.azure_cost import iter_streamed_cost_pages, _cost_query_request
+
+    settings = StandinSettings(subscriptions=["sub-a"], services_per_subscription=20, page_size=50)
+    url, payload = _cost_query_request("2026-06-01", "2026-06-10", "sub-a", "query", "Daily")
+
+    async def collect():
+        pages = []
+        async for page in iter_streamed_cost_pages(url, "token", payload, "sub-a", "query", batch_rows=16):
+            pages.append(page)
+        return pages
+
+    pages, stats = _run_against_standin(settings, collect)
+
+    rows = [row for page in pages for row in page["properties"]["rows"]]
+    assert len(rows) == 10 * 20
+    assert max(len(page["properties"]["rows"]) for page in pages) <= 50
+    assert all(page["properties"]["columns"][0]["name"] == "Cost" for page in pages)
+    assert stats["cost_requests"] == 4
+
+
+def test_management_group_queries_are_filtered_to_configured_subscriptions():
+    from src.services.azure_cost_scope import _iter_scope_cost_data
+
+    settings = StandinSettings(subscriptions=[f"sub-{index}" for index in range(10)], services_per_subscription=3)
+    configured = ["sub-1", "sub-4", "sub-7"]
+
+    async def collect():
+        rows = []
+        with patch("src.services.azure_cost_scope.MOCK_AZURE", False), \
+             patch("src.services.azure_cost_scope.BASE_URL", "http://standin"), \
+             patch("src.services.azure_cost_scope.COST_SCOPE_FILTER_BATCH_SIZE", 2):
+            async for page in _iter_scope_cost_data(
+                "token", "2026-06-01", "2026-06-05", subscription_ids=configured
+            ):
+                rows.extend(page["properties"]["rows"])
+        return rows
+
+    rows, stats = _run_against_standin(settings, collect)
+
+    assert {row[2] for row in rows} == set(configured)
+    assert len(rows) == 5 * 3 * len(configured)
+    assert stats["cost_requests"] == 2
+
+
+def test_recorded_run_replays_offline_with_identical_results(tmp_path):
+    from src.main import process_subscription
+    from src.services import azure_billing
+    from src.services.cassette import Cassette, use_cassette
+
+    path = str(tmp_path / "run.cassette.gz")
+    settings = StandinSettings(subscriptions=["sub-a"], services_per_subscription=4, page_size=40)
+
+    def billing_patches(client):
+        return patch("src.services.azure_billing.MOCK_AZURE", False), \
+            patch("src.services.azure_billing.BASE_URL", "http://standin"), \
+            patch("src.services.azure_billing.get_http_client", return_value=client), \
+            patch.dict(azure_billing._billing_period_cache, clear=True)
+
+    async def record():
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_standin_app(settings)))
+        mock_off, base_url, http_client, cache = billing_patches(client)
+        with mock_off, base_url, http_client, cache, use_cassette(Cassette.for_recording(path)):
+            return await process_subscription("sub-a", "token")
+
+    recorded, _ = _run_against_standin(settings, record)
+
+    def offline(request):
+        raise AssertionError(f"Unexpected network call during replay: {request.url}")
+
+    async def replay():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(offline))
+        mock_off, base_url, http_client, cache = billing_patches(client)
+        with mock_off, base_url, http_client, cache, patch("src.services.azure_cost.get_http_client", return_value=client), \
+             use_cassette(Cassette.load(path, speed=0)):
+            return await process_subscription("sub-a", "token")
+
+    with patch("src.services.azure_cost.MOCK_AZURE", False), \
+         patch("src.services.azure_cost.BASE_URL", "http://standin"), \
+         patch("src.services.azure_cost.response_cache", ResponseCache(enabled=False)):
+        replayed = asyncio.run(replay())
+
+    assert recorded["month_to_day"] > 0
+    assert replayed == recorded
+
+
+def test_management_group_membership_comes_from_the_descendants_listing():
+    from src.services.azure_cost_scope import get_management_group_subscription_ids
+
+    settings = StandinSettings(subscriptions=["Sub-1", "sub-2"])
+
+    async def lookup():
+        with patch("src.services.azure_cost_scope.MOCK_AZURE", False), \
+             patch("src.services.azure_cost_scope.BASE_URL", "http://standin"):
+            return await get_management_group_subscription_ids("token", "mg-root")
+
+    members, _ = _run_against_standin(settings, lookup)
+
+    assert members == {"sub-1", "sub-2"}
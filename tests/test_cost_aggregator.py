@@ -1,6 +1,18 @@
+import random
+from datetime import date, timedelta
 from decimal import Decimal
+from unittest.mock import patch
 
-from src.services.cost_aggregator import derive_forecast_metrics, derive_metrics_from_daily_rows
+import pytest
+
+from src.services import cost_vectorized
+from src.services.cost_aggregator import (
+    DailyMetricsAccumulator,
+    derive_forecast_metrics,
+    derive_metrics_from_daily_rows,
+)
+from src.services.cost_columns import CostColumns
+from src.utils.money import MoneyAccumulator
 
 
 DATES = {
@@ -48,6 +60,25 @@ def test_derive_forecast_metrics_from_daily_rows():
     assert forecast["year_forecast"] == Decimal("350.00")
 
 
+def test_forecast_from_today_is_combined_with_actuals_before_today():
+    actual_rows = [
+        _row(40.0, "20260301", "Storage Accounts"),
+        _row(5.0, "20260618", "Virtual Machines"),
+        _row(3.0, "20260620", "Virtual Machines"),
+    ]
+    forecast_rows = [
+        _row(6.0, "20260620", "Virtual Machines"),
+        _row(60.0, "20260625", "Virtual Machines"),
+        _row(100.0, "20260710", "Virtual Machines"),
+    ]
+
+    actual = derive_metrics_from_daily_rows(actual_rows, DATES)
+    forecast = derive_forecast_metrics(forecast_rows, DATES, actual)
+
+    assert forecast["month_forecast"] == Decimal("71.00")
+    assert forecast["year_forecast"] == Decimal("211.00")
+
+
 def test_derive_metrics_handles_yyyymmdd_int_dates():
     rows = [_row(12.0, 20260618, "Bandwidth", "CAD")]
 
@@ -55,3 +86,90 @@ def test_derive_metrics_handles_yyyymmdd_int_dates():
 
     assert metrics["daily_cost"] == Decimal("12.00")
     assert metrics["currency_code"] == "CAD"
+
+
+def test_day_key_parses_each_usage_date_format_once():
+    from src.services import cost_columns
+
+    expected = date(2026, 6, 18).toordinal()
+    with patch.dict(cost_columns._day_keys, clear=True), \
+         patch.object(cost_columns, "_normalize_usage_date", wraps=cost_columns._normalize_usage_date) as parse:
+        keys = [cost_columns.day_key(value) for value in (20260618, "20260618", "2026-06-18T00:00:00", 20260618)]
+        assert cost_columns.day_key("not-a-date") is None
+
+    assert keys == [expected] * 4
+    assert parse.call_count == 4
+
+
+
+def _random_rows(count, seed=7):
+    rng = random.Random(seed)
+    services = ["Virtual Machines", "Storage Accounts", "Key Vault", "Bandwidth", None]
+    rows = []
+    for _ in range(count):
+        usage_date = date(2026, 1, 1) + timedelta(days=rng.randint(0, 364))
+        rows.append(_row(round(rng.uniform(0, 250), 6), int(usage_date.strftime("%Y%m%d")), rng.choice(services)))
+    rows.append(["n/a", 20260618, "Virtual Machines", "USD"])
+    rows.append([1.0, "not-a-date", "Virtual Machines", "USD"])
+    return rows
+
+
+def _fixed_point_sums(rows, start, end):
+    """Reference totals: every valid row in [start, end] summed with MoneyAccumulator."""
+    total = MoneyAccumulator()
+    by_service = {}
+    for cost, usage_date, service, _ in rows:
+        if isinstance(cost, float) and start <= str(usage_date) <= end:
+            total.add(cost)
+            by_service.setdefault(service or "Unknown", MoneyAccumulator()).add(cost)
+    return total, by_service
+
+
+def test_vectorized_backend_matches_fixed_point_sums():
+    pytest.importorskip("numpy")
+    rows = _random_rows(5000)
+
+    with patch.object(cost_vectorized, "COST_VECTORIZE_MIN_ROWS", 10**9):
+        scalar = derive_metrics_from_daily_rows(rows, DATES)
+        scalar_forecast = derive_forecast_metrics(rows, DATES, scalar)
+    with patch.object(cost_vectorized, "COST_VECTORIZE_MIN_ROWS", 1), \
+         patch.object(cost_vectorized, "bucket_columns", wraps=cost_vectorized.bucket_columns) as reduce:
+        vector = derive_metrics_from_daily_rows(rows, DATES)
+        vector_forecast = derive_forecast_metrics(rows, DATES, vector)
+
+    assert reduce.called
+    daily, _ = _fixed_point_sums(rows, "20260618", "20260618")
+    month, month_by_service = _fixed_point_sums(rows, "20260601", "20260620")
+    year, _ = _fixed_point_sums(rows, "20260101", "20260620")
+    assert vector["daily_cost"] == daily.cents()
+    assert vector["month_to_day"] == month.cents()
+    assert vector["year_to_day"] == year.cents()
+    assert {item["service"]: item["raw_cost"] for item in vector["service_breakdown"]} == {
+        service: float(total.decimal()) for service, total in month_by_service.items()
+    }
+    assert vector == scalar
+    assert vector_forecast == scalar_forecast
+
+
+def test_small_batches_stay_on_scalar_path():
+    with patch.object(cost_vectorized, "bucket_columns") as reduce:
+        derive_metrics_from_daily_rows([_row(1.0, "20260618")], DATES)
+
+    reduce.assert_not_called()
+
+
+def test_accumulator_reads_subscription_views_like_rows():
+    rows = _random_rows(300)
+    page_rows = [[row[0], row[1], "sub-a", row[2], row[3]] for row in rows]
+    columns = CostColumns.from_page(
+        {
+            "properties": {
+                "columns": [{"name": name} for name in ("Cost", "UsageDate", "SubscriptionId", "ServiceName", "Currency")],
+                "rows": page_rows,
+            }
+        }
+    )
+    from_columns = DailyMetricsAccumulator(DATES)
+    from_columns.add_columns(columns.by_subscription()["sub-a"])
+
+    assert from_columns.result() == derive_metrics_from_daily_rows(rows, DATES)
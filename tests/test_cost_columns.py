@@ -0,0 +1,105 @@
+from datetime import date
+
+import pytest
+
+from src.services.cost_columns import CostColumns
+
+
+def _page(rows):
+    names = ["Cost", "UsageDate", "SubscriptionId", "ServiceName", "Currency"]
+    return {"properties": {"columns": [{"name": name} for name in names], "rows": rows}}
+
+
+def _day(text):
+    return date.fromisoformat(text).toordinal()
+
+
+def test_from_rows_encodes_columns_and_skips_invalid_rows():
+    columns = CostColumns.from_rows(
+        [
+            [1.25, 20260618, "Virtual Machines", "USD"],
+            [0.5, "2026-06-19T00:00:00", None, None],
+            ["n/a", 20260618, "Key Vault", "USD"],
+            [2.0, "not-a-date", "Key Vault", "USD"],
+            [3.0, 20260618],
+            [4.0, 20260620, "Virtual Machines", "EUR"],
+        ]
+    )
+
+    assert len(columns) == 3
+    assert list(columns.costs) == [125000000, 50000000, 400000000]
+    assert list(columns.days) == [_day("2026-06-18"), _day("2026-06-19"), _day("2026-06-20")]
+    assert [columns.service_names[code] for code in columns.services] == ["Virtual Machines", "Unknown", "Virtual Machines"]
+    assert columns.currency_code == "EUR"
+    assert columns.nbytes == 3 * (8 + 4 + 4 + 2 + 4)
+
+
+def test_by_subscription_returns_day_ordered_views_of_one_buffer():
+    columns = CostColumns.from_page(
+        _page(
+            [
+                [3.0, 20260619, "SUB-B", "Storage", "USD"],
+                [1.0, 20260618, "sub-a", "Storage", "USD"],
+                [2.0, 20260617, "sub-b", "Key Vault", "USD"],
+                [9.0, 20260617, None, "Storage", "USD"],
+                [4.0, 20260616, "sub-a", "Key Vault", "USD"],
+            ]
+        )
+    )
+
+    views = columns.by_subscription()
+
+    assert sorted(views) == ["sub-a", "sub-b"]
+    assert list(views["sub-a"].costs) == [400000000, 100000000]
+    assert list(views["sub-b"].days) == [_day("2026-06-17"), _day("2026-06-19")]
+    assert isinstance(views["sub-b"].costs, memoryview)
+    assert views["sub-a"].costs.obj is views["sub-b"].costs.obj
+    assert views["sub-b"].service_names is columns.service_names
+
+
+def test_between_slices_a_date_range_without_copying():
+    columns = CostColumns.from_rows(
+        [[float(day), f"2026-06-{day:02d}", "Storage", "USD"] for day in range(1, 31)],
+        subscription_id="sub-a",
+    )
+    june = columns.by_subscription()["sub-a"]
+
+    week = june.between(_day("2026-06-08"), _day("2026-06-14"))
+
+    assert len(week) == 7
+    assert sum(week.costs) == sum(range(8, 15)) * 10**8
+    assert week.costs.obj is june.costs.obj
+
+
+def test_between_requires_day_ordered_rows():
+    columns = CostColumns.from_rows([[1.0, 20260618, "Storage", "USD"]])
+
+    with pytest.raises(ValueError):
+        columns.between(_day("2026-06-01"), _day("2026-06-30"))
+
+
+def test_partition_page_splits_rows_by_subscription_in_one_pass():
+    from src.services.cost_columns import CodeBook, partition_page
+
+    codebooks = (CodeBook(), CodeBook(), CodeBook())
+    page = {
+        "properties": {
+            "columns": [{"name": name} for name in ("ServiceName", "SubscriptionId", "UsageDate", "Currency", "Cost")],
+            "rows": [
+                ["Storage", "SUB-A", 20260618, "USD", 1.0],
+                ["Key Vault", "sub-b", 20260618, "USD", 2.0],
+                ["Storage", None, 20260618, "USD", 9.0],
+                ["Storage", "sub-a", 20260619, None, 3.0],
+            ],
+        }
+    }
+
+    first = partition_page(page, codebooks)
+    second = partition_page(page, codebooks)
+
+    assert sorted(first) == ["sub-a", "sub-b"]
+    assert list(first["sub-a"].costs) == [100000000, 300000000]
+    assert [first["sub-a"].service_names[code] for code in first["sub-a"].services] == ["Storage", "Storage"]
+    assert first["sub-a"].currency_code == "USD"
+    assert list(second["sub-b"].services) == list(first["sub-b"].services)
+    assert len(codebooks[0]) == 2
@@ -0,0 +1,92 @@
+import random
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from src.services import cost_vectorized
+from src.services.cost_columns import CostColumns
+from src.services.cost_cube import CostCubeBuilder, ReportCubes, date_key
+
+FIRST = date(2026, 1, 1)
+SERVICES = ["Virtual Machines", "Storage Accounts", "Key Vault"]
+
+
+def _rows(count=2000, seed=3):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        day = FIRST + timedelta(days=rng.randint(-10, 190))
+        rows.append([round(rng.uniform(0, 50), 6), int(day.strftime("%Y%m%d")), rng.choice(SERVICES), "USD"])
+    return rows
+
+
+def _cube(rows):
+    builder = CostCubeBuilder(FIRST.toordinal(), date(2026, 6, 30).toordinal())
+    builder.add(CostColumns.from_rows(rows))
+    return builder.build()
+
+
+def _brute_force(rows, start, end, service=None):
+    return sum(
+        round(row[0] * 10**8)
+        for row in rows
+        if start <= str(row[1]) <= end and (service is None or row[2] == service)
+    )
+
+
+@pytest.mark.parametrize(
+    "start,end",
+    [("2026-01-01", "2026-06-30"), ("2026-06-12", "2026-06-18"), ("2026-03-01", "2026-03-31"), ("2026-06-18", "2026-06-18")],
+)
+def test_cube_range_totals_match_a_full_scan(start, end):
+    rows = _rows()
+    cube = _cube(rows)
+    start_key, end_key = start.replace("-", ""), end.replace("-", "")
+
+    assert cube.total_units(date_key(start), date_key(end)) == _brute_force(rows, start_key, end_key)
+    breakdown = cube.breakdown_units(date_key(start), date_key(end))
+    for service in SERVICES:
+        assert breakdown.get(service, 0) == _brute_force(rows, start_key, end_key, service)
+
+
+def test_cube_clamps_ranges_to_its_window_and_keeps_zero_cost_services():
+    cube = _cube([[0.0, 20260305, "Free Tier", "USD"], [2.5, 20251231, "Storage Accounts", "USD"]])
+
+    assert cube.total_units(date_key("2025-01-01"), date_key("2027-01-01")) == 0
+    assert cube.breakdown_units(date_key("2026-03-01"), date_key("2026-03-31")) == {"Free Tier": 0}
+    assert cube.breakdown_units(date_key("2026-04-01"), date_key("2026-04-30")) == {}
+
+
+def test_vectorized_bucketing_builds_the_same_cube():
+    pytest.importorskip("numpy")
+    rows = _rows()
+
+    with patch.object(cost_vectorized, "COST_VECTORIZE_MIN_ROWS", 10**9), \
+         patch.object(cost_vectorized, "np", None):
+        scalar = _cube(rows)
+    with patch.object(cost_vectorized, "COST_VECTORIZE_MIN_ROWS", 1):
+        vector = _cube(rows)
+
+    assert list(vector.total) == list(scalar.total)
+    assert {service: list(prefix) for service, prefix in vector.costs.items()} == {
+        service: list(prefix) for service, prefix in scalar.costs.items()
+    }
+    assert {service: list(prefix) for service, prefix in vector.rows.items()} == {
+        service: list(prefix) for service, prefix in scalar.rows.items()
+    }
+
+
+def test_range_summary_reports_actual_and_forecast():
+    cubes = ReportCubes()
+    cubes.publish("Production", _cube([[10.0, 20260610, "Virtual Machines", "USD"]]), _cube([[4.0, 20260625, "Virtual Machines", "USD"]]))
+
+    summary = cubes.range_summary("2026-06-01", "2026-06-30")
+
+    assert summary["subscriptions"][0]["actual"] == 10
+    assert summary["subscriptions"][0]["forecast"] == 4
+    assert summary["subscriptions"][0]["service_breakdown"] == [{"service": "Virtual Machines", "cost": 10}]
+    with pytest.raises(ValueError):
+        cubes.range_summary("2026-07-01", "2026-06-01")
+    with pytest.raises(KeyError):
+        cubes.range_summary("2026-06-01", "2026-06-30", "Staging")
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from src.services.cost_stream_parser import CostRowStreamParser
+
+
+def _response(rows, next_link=None):
+    return json.dumps(
+        {
+            "id": "query-1",
+            "properties": {
+                "nextLink": next_link,
+                "columns": [{"name": "Cost", "type": "Number"}, {"name": "UsageDate", "type": "Number"}],
+                "rows": rows,
+            },
+        }
+    )
+
+
+def test_stream_parser_yields_rows_split_across_chunks():
+    rows = [[1.25, 20260101, "Virtual Machines", "USD"], [0.5, 20260102, "Key Vault, Premium", "USD"]]
+    body = _response(rows, next_link="https://example/next?$skiptoken=2")
+    parser = CostRowStreamParser()
+
+    parsed = []
+    for index in range(0, len(body), 7):
+        parsed.extend(parser.feed(body[index:index + 7]))
+    skeleton = parser.close()
+
+    assert parsed == rows
+    assert parser.columns[1]["name"] == "UsageDate"
+    assert skeleton["properties"]["rows"] == []
+    assert skeleton["properties"]["nextLink"] == "https://example/next?$skiptoken=2"
+
+
+def test_stream_parser_rejects_truncated_rows():
+    body = _response([[1.0, 20260101, "Storage", "USD"]])
+    parser = CostRowStreamParser()
+    parser.feed(body[: body.index("Storage")])
+
+    with pytest.raises(ValueError):
+        parser.close()
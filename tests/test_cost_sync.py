@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from src.services.cost_sync import DailyRowStore, iter_incremental_daily_pages, missing_ranges
+
+
+def _fake_iter_cost_data(calls):
+    async def fake(token, start_date, end_date, subscription_id, query="query", granularity="Daily"):
+        calls.append((start_date, end_date))
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        rows = []
+        while start <= end:
+            rows.append([1.5, int(start.strftime("%Y%m%d")), "Virtual Machines", "USD"])
+            start += timedelta(days=1)
+        yield {"properties": {"rows": rows}}
+
+    return fake
+
+
+def _collect(store, calls):
+    async def run():
+        rows = []
+        with patch("src.services.cost_sync.iter_cost_data", new=_fake_iter_cost_data(calls)):
+            async for page in iter_incremental_daily_pages(
+                "token", "2026-01-01", "2026-06-20", "sub-a", store=store, trailing_days=4
+            ):
+                rows.extend(page["properties"]["rows"])
+        return rows
+
+    return asyncio.run(run())
+
+
+def test_incremental_sync_only_refetches_trailing_window(tmp_path):
+    store = DailyRowStore(str(tmp_path))
+    first_calls, second_calls = [], []
+
+    first = _collect(store, first_calls)
+    second = _collect(store, second_calls)
+
+    assert first_calls == [("2026-01-01", "2026-06-16"), ("2026-06-17", "2026-06-20")]
+    assert second_calls == [("2026-06-17", "2026-06-20")]
+    assert sorted(row[1] for row in second) == sorted(row[1] for row in first)
+    assert len(second) == 171
+
+
+def test_missing_ranges_reports_gaps():
+    stored = {"20260101": [], "20260102": [], "20260105": []}
+
+    ranges = missing_ranges(stored, datetime(2026, 1, 1), datetime(2026, 1, 6))
+
+    assert ranges == [
+        (datetime(2026, 1, 3), datetime(2026, 1, 4)),
+        (datetime(2026, 1, 6), datetime(2026, 1, 6)),
+    ]
+
+
+def test_stale_fallback_pages_are_not_persisted_as_settled(tmp_path):
+    from src.services.response_cache import STALE_AS_OF_KEY
+
+    store = DailyRowStore(str(tmp_path))
+
+    async def stale_iter_cost_data(token, start_date, end_date, subscription_id, query="query", granularity="Daily"):
+        yield {"properties": {"rows": [[2.0, 20260110, "Virtual Machines", "USD"]]}, STALE_AS_OF_KEY: "2026-06-19 07:00"}
+
+    async def run():
+        with patch("src.services.cost_sync.iter_cost_data", new=stale_iter_cost_data):
+            async for _ in iter_incremental_daily_pages(
+                "token", "2026-01-01", "2026-01-20", "sub-a", store=store, trailing_days=4
+            ):
+                pass
+
+    asyncio.run(run())
+
+    assert store.load("sub-a") == {}
@@ -86,9 +86,9 @@ def client():
 def reset_app_cache():
     import src.app as app_module
 
-    app_module._cached_data = None
+    app_module._cached_data = app_module._cached_cubes = None
     yield
-    app_module._cached_data = None
+    app_module._cached_data = app_module._cached_cubes = None
 
 
 @pytest.fixture(autouse=True)
@@ -185,6 +185,43 @@ class TestFastAPIEndpoints:
         refreshed = response.json()["data"]
         assert len(refreshed["subscriptions"]) == len(first["subscriptions"])
 
+    def test_cost_range_api_reads_report_cube(self, client):
+        entry = client.get("/api/costs").json()["subscriptions"][0]
+        dates = entry["dates"]
+
+        response = client.get(
+            "/api/costs/range",
+            params={"start": dates["month_starts_on"], "end": dates["today"], "subscription": entry["subscription_name"]},
+        )
+
+        assert response.status_code == 200
+        summary = response.json()["subscriptions"][0]
+        assert float(summary["actual"]) == pytest.approx(float(entry["month_to_day"]))
+        assert [item["service"] for item in summary["service_breakdown"]] == [
+            item["service"] for item in entry["service_breakdown"]
+        ]
+        assert client.get("/api/costs/range", params={"start": "2026-02-01", "end": "2026-01-01"}).status_code == 400
+        assert client.get(
+            "/api/costs/range", params={"start": "2026-01-01", "end": "2026-01-31", "subscription": "nope"}
+        ).status_code == 404
+
+    def test_cost_range_api_keeps_cubes_of_the_cached_report_when_a_refresh_fails(self, client):
+        entry = client.get("/api/costs").json()["subscriptions"][0]
+        params = {"start": entry["dates"]["month_starts_on"], "end": entry["dates"]["today"]}
+
+        with patch("src.app.get_report_data", side_effect=ValueError("No data available to generate the report.")):
+            assert client.post("/api/refresh").status_code == 500
+
+        response = client.get("/api/costs/range", params=params)
+        assert response.status_code == 200
+        assert len(response.json()["subscriptions"]) == len(client.get("/api/costs").json()["subscriptions"])
+
+    def test_cost_range_api_reports_failed_fetch_as_server_error(self, client):
+        with patch("src.app.get_report_data", side_effect=ValueError("No data available to generate the report.")):
+            response = client.get("/api/costs/range", params={"start": "2026-01-01", "end": "2026-01-31"})
+
+        assert response.status_code == 500
+
     def test_download_pdf_returns_valid_pdf(self, client):
         response = client.get("/api/download/pdf")
         assert response.status_code == 200
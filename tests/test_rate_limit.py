@@ -2,6 +2,8 @@ import asyncio
 from unittest.mock import AsyncMock, patch
 
 from src.main import process_subscription
+from src.services.response_cache import ResponseCache
+from src.services.rate_limiter import AdaptiveRateLimiter, TENANT_SCOPE, scopes_for_request
 
 
 MOCK_DATES = {
@@ -14,27 +16,44 @@ MOCK_DATES = {
 }
 
 
-def test_process_subscription_uses_two_consolidated_cost_calls():
-    empty_response = {"properties": {"rows": []}}
+class RecordingCostPages:
+    """Stands in for iter_cost_data and records each query it is asked for."""
+
+    def __init__(self, pages=None):
+        self.pages = pages or [{"properties": {"rows": []}}]
+        self.calls = []
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        return self._iterate()
+
+    async def _iterate(self):
+        for page in self.pages:
+            yield page
+
+
+def test_process_subscription_uses_monthly_for_closed_months_and_daily_for_open_period():
+    cost_pages = RecordingCostPages()
 
     async def run():
         with patch("src.main.get_subscription_name", new=AsyncMock(return_value="Test Sub")), \
              patch("src.main.get_forecast_month_date", new=AsyncMock(return_value=MOCK_DATES)), \
-             patch("src.main.get_cost_data", new=AsyncMock(return_value=empty_response)) as mock_cost:
+             patch("src.main.iter_cost_data", new=cost_pages):
             result = await process_subscription("sub-test", "token")
 
-        assert mock_cost.await_count == 2
-        actual_call, forecast_call = mock_cost.await_args_list
+        assert len(cost_pages.calls) == 3
+        (monthly_args, monthly_kwargs), (daily_args, daily_kwargs), (forecast_args, forecast_kwargs) = cost_pages.calls
 
-        assert actual_call.args[1] == MOCK_DATES["year_starts_on"]
-        assert actual_call.args[2] == MOCK_DATES["today"]
-        assert actual_call.kwargs["query"] == "query"
-        assert actual_call.kwargs["granularity"] == "Daily"
+        assert monthly_args[1:3] == ("2026-01-01", "2026-05-31")
+        assert monthly_kwargs["granularity"] == "Monthly"
+        assert daily_args[1:3] == ("2026-06-01", MOCK_DATES["today"])
+        assert daily_kwargs["query"] == "query"
+        assert daily_kwargs["granularity"] == "Daily"
 
-        assert forecast_call.args[1] == MOCK_DATES["year_starts_on"]
-        assert forecast_call.args[2] == MOCK_DATES["year_ends_on"]
-        assert forecast_call.kwargs["query"] == "forecast"
-        assert forecast_call.kwargs["granularity"] == "Daily"
+        assert forecast_args[1] == MOCK_DATES["today"]
+        assert forecast_args[2] == MOCK_DATES["year_ends_on"]
+        assert forecast_kwargs["query"] == "forecast"
+        assert forecast_kwargs["granularity"] == "Daily"
 
         assert result["subscription_name"] == "Test Sub"
         assert "month_to_day" in result
@@ -43,6 +62,51 @@ def test_process_subscription_uses_two_consolidated_cost_calls():
     asyncio.run(run())
 
 
+def test_process_subscription_aggregates_every_page():
+    cost_pages = RecordingCostPages([
+        {"properties": {"rows": [[5.0, "20260618", "Virtual Machines", "USD"]]}},
+        {"properties": {"rows": [[2.5, "20260619", "Key Vault", "USD"]]}},
+    ])
+
+    async def run():
+        with patch("src.services.azure_cost.COST_HYBRID_GRANULARITY", False), \
+             patch("src.main.get_subscription_name", new=AsyncMock(return_value="Test Sub")), \
+             patch("src.main.get_forecast_month_date", new=AsyncMock(return_value=MOCK_DATES)), \
+             patch("src.main.iter_cost_data", new=cost_pages):
+            return await process_subscription("sub-test", "token")
+
+    result = asyncio.run(run())
+
+    assert str(result["daily_cost"]) == "5.00"
+    assert str(result["month_to_day"]) == "7.50"
+    assert len(result["service_breakdown"]) == 2
+
+
+def test_iter_cost_data_follows_next_link():
+    from src.services.azure_cost import iter_cost_data
+
+    next_link = "https://example.test/next?$skiptoken=2"
+    requested = []
+
+    async def fake_call(url, token, payload, subscription_id, query_type):
+        requested.append((url, payload))
+        if url == next_link:
+            return {"properties": {"rows": [[2.0]], "nextLink": None}}
+        return {"properties": {"rows": [[1.0]], "nextLink": next_link}}
+
+    async def collect_rows():
+        pages = iter_cost_data("token", "2026-06-01", "2026-06-20", "sub", granularity="Daily")
+        return [row async for page in pages for row in page["properties"]["rows"]]
+
+    with patch("src.services.azure_cost.MOCK_AZURE", False), \
+         patch("src.services.azure_cost._throttled_cost_api_call", side_effect=fake_call):
+        rows = asyncio.run(collect_rows())
+
+    assert rows == [[1.0], [2.0]]
+    assert requested[1][0] == next_link
+    assert requested[1][1] == requested[0][1]
+
+
 def test_get_report_data_processes_subscriptions_sequentially():
     from src.main import get_report_data
 
@@ -70,3 +134,176 @@ def test_get_report_data_processes_subscriptions_sequentially():
         asyncio.run(get_report_data())
 
     assert call_order == ["sub-a", "sub-b"]
+
+
+def test_process_subscriptions_runs_concurrently_and_keeps_order():
+    from src.main import process_subscriptions
+
+    in_flight = 0
+    peak = 0
+
+    async def fake_process(sub_id, token):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01 if sub_id != "sub-a" else 0.03)
+        in_flight -= 1
+        if sub_id == "sub-c":
+            raise RuntimeError("boom")
+        return {"subscription_name": sub_id}
+
+    with patch("src.main.process_subscription", side_effect=fake_process):
+        results = asyncio.run(
+            process_subscriptions(["sub-a", "sub-b", "sub-c", "sub-d"], "token", concurrency=2)
+        )
+
+    assert peak == 2
+    assert [entry["subscription_name"] for entry in results] == ["sub-a", "sub-b", "sub-d"]
+
+
+def test_fetch_azure_data_reuses_pooled_client_and_retries_429():
+    import httpx
+
+    from src.services.azure_cost import fetch_azure_data
+
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(
+                429,
+                headers={"x-ms-ratelimit-microsoft.costmanagement-entity-retry-after": "0"},
+            )
+        return httpx.Response(200, json={"properties": {"rows": [[1.0, 20260618, "VM", "USD"]]}})
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        limiter = AdaptiveRateLimiter(initial_rate=100, max_rate=100, burst=10)
+        with patch("src.services.azure_cost.get_http_client", return_value=client), \
+             patch("src.services.azure_cost.rate_limiter", limiter), \
+             patch("src.services.azure_cost._retry_delay", return_value=0):
+            data = await fetch_azure_data("https://example.test/query", "token", {"type": "ActualCost"})
+        await client.aclose()
+        return data
+
+    data = asyncio.run(run())
+
+    assert len(calls) == 2
+    assert calls[0].headers["Authorization"] == "Bearer token"
+    assert data["properties"]["rows"][0][2] == "VM"
+
+
+def test_http_client_is_pooled_per_event_loop():
+    from src.services.azure_http import close_http_client, get_http_client
+
+    async def run():
+        first = get_http_client()
+        second = get_http_client()
+        await close_http_client()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second
+    assert first.is_closed
+
+
+def test_throttled_request_releases_permit_during_backoff():
+    import httpx
+
+    from src.services.azure_cost import fetch_azure_data
+
+    completed = []
+    throttled_once = set()
+
+    def handler(request):
+        if request.url.path == "/subscriptions/slow" and "slow" not in throttled_once:
+            throttled_once.add("slow")
+            return httpx.Response(429, headers={"retry-after": "0.2"})
+        return httpx.Response(200, json={"path": request.url.path})
+
+    async def fetch(client, path):
+        data = await fetch_azure_data(f"https://example.test{path}", "token")
+        completed.append(data["path"])
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        limiter = AdaptiveRateLimiter(initial_rate=100, max_rate=100, burst=10)
+        with patch("src.services.azure_cost.get_http_client", return_value=client), \
+             patch("src.services.azure_cost.rate_limiter", limiter), \
+             patch("src.services.azure_cost._retry_delay", return_value=0.2):
+            await asyncio.gather(
+                fetch(client, "/subscriptions/slow"), fetch(client, "/subscriptions/fast")
+            )
+        await client.aclose()
+
+    asyncio.run(run())
+
+    assert completed == ["/subscriptions/fast", "/subscriptions/slow"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_limiter_backs_off_per_scope_on_429():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(initial_rate=2.0, min_rate=0.1, max_rate=4.0, burst=2, clock=clock)
+    throttled = scopes_for_request("https://management.azure.com/subscriptions/SUB-A/providers/x")
+    other = scopes_for_request("https://management.azure.com/subscriptions/sub-b/providers/x")
+
+    assert throttled == ("subscription:sub-a", TENANT_SCOPE)
+    limiter.observe(
+        throttled,
+        429,
+        {"x-ms-ratelimit-microsoft.costmanagement-entity-retry-after": "30"},
+    )
+
+    assert limiter.bucket("subscription:sub-a").rate == 1.0
+    assert limiter.reserve(throttled) == 30.0
+    assert limiter.reserve(other) == 0.0
+
+
+def test_rate_limiter_tunes_rate_from_remaining_quota_headers():
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(initial_rate=1.0, min_rate=0.1, max_rate=1.5, burst=1, clock=clock)
+    scopes = ("subscription:sub-a", TENANT_SCOPE)
+    bucket = limiter.bucket("subscription:sub-a")
+
+    for _ in range(10):
+        limiter.observe(scopes, 200, {"x-ms-ratelimit-microsoft.costmanagement-qpu-remaining": "QueryResource=100"})
+    assert bucket.rate == 1.5
+
+    limiter.observe(scopes, 200, {"x-ms-ratelimit-microsoft.costmanagement-qpu-remaining": "QueryResource=5"})
+    assert bucket.rate == 1.125
+
+
+def test_identical_concurrent_requests_share_one_call():
+    from src.services.azure_cost import _throttled_cost_api_call
+
+    calls = []
+
+    async def slow_fetch(url, token, payload, **kwargs):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return {"properties": {"rows": []}}
+
+    async def run():
+        with patch("src.services.azure_cost.fetch_azure_data", side_effect=slow_fetch), \
+             patch("src.services.azure_cost.response_cache", ResponseCache(enabled=False)):
+            payload = {"type": "ActualCost", "timePeriod": {"from": "2026-01-01", "to": "2026-06-20"}}
+            same = {"timePeriod": {"to": "2026-06-20", "from": "2026-01-01"}, "type": "ActualCost"}
+            return await asyncio.gather(
+                _throttled_cost_api_call("https://example.test/q", "t", payload, "sub", "query"),
+                _throttled_cost_api_call("https://example.test/q", "t", same, "sub", "query"),
+                _throttled_cost_api_call("https://example.test/other", "t", payload, "sub", "query"),
+            )
+
+    first, second, other = asyncio.run(run())
+
+    assert calls == ["https://example.test/q", "https://example.test/other"]
+    assert first is second
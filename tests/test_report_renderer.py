@@ -100,3 +100,67 @@ def test_get_report_data_sorts_subscriptions():
 
     names = [entry["subscription_name"] for entry in data["subscriptions"]]
     assert names == ["Alpha", "Zeta"]
+
+
+def test_stale_subscription_is_marked_and_not_rendered_as_cost_column(renderer):
+    entry = {
+        **MOCK_REPORT_DATA["subscriptions"][0],
+        "data_status": {"state": "stale", "as_of": "2026-06-18 07:30"},
+    }
+    html = renderer.render({**MOCK_REPORT_DATA, "subscriptions": [entry]}, mode=ReportMode.STATIC)
+
+    assert "Stale data as of 2026-06-18 07:30" in html
+    assert "data status" not in html
+
+
+def test_unavailable_subscription_is_marked_instead_of_showing_costs(renderer):
+    from src.main import unavailable_entry
+
+    with patch("src.main.cached_subscription_name", return_value="Late Subscription"):
+        late = unavailable_entry("sub-late", "deadline")
+    html = renderer.render(
+        {**MOCK_REPORT_DATA, "subscriptions": [late, *MOCK_REPORT_DATA["subscriptions"]]},
+        mode=ReportMode.STATIC,
+    )
+
+    assert "Late Subscription" in html
+    assert "Data unavailable" in html
+    assert "data status" not in html
+
+
+def test_other_services_row_links_to_full_list_only_in_interactive_mode(renderer):
+    entry = {
+        **MOCK_REPORT_DATA["subscriptions"][0],
+        "service_breakdown": [
+            {"service": "Virtual Machines", "cost": "$80.00", "raw_cost": 80.0},
+            {"service": "Other services", "cost": "$20.00", "raw_cost": 20.0, "other_count": 42},
+        ],
+        "dates": {"month_starts_on": "2026-06-01", "today": "2026-06-19"},
+    }
+    data = {**MOCK_REPORT_DATA, "subscriptions": [entry]}
+
+    static_html = renderer.render(data, mode=ReportMode.STATIC)
+    interactive_html = renderer.render(data, mode=ReportMode.INTERACTIVE)
+
+    assert "Other services (42)" in static_html
+    assert "Show all services" not in static_html
+    assert "Show all services" in interactive_html
+    assert 'data-start="2026-06-01"' in interactive_html
+
+
+def test_unavailable_entry_renders_alongside_decimal_costs(renderer):
+    from decimal import Decimal
+
+    from src.main import unavailable_entry
+
+    available = {
+        **MOCK_REPORT_DATA["subscriptions"][0],
+        **{key: Decimal("12.34") for key in ("daily_cost", "month_to_day", "month_forecast", "year_to_day", "year_forecast")},
+    }
+    with patch("src.main.cached_subscription_name", return_value="Late Subscription"):
+        late = unavailable_entry("sub-late", "error")
+
+    html = renderer.render({**MOCK_REPORT_DATA, "subscriptions": [available, late]}, mode=ReportMode.STATIC)
+
+    assert "Late Subscription" in html
+    assert "12.34" in html
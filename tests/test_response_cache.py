@@ -0,0 +1,100 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from src.services.response_cache import ResponseCache
+
+
+def test_response_cache_serves_fresh_hits_and_falls_back_when_azure_fails(tmp_path):
+    from src.services.azure_cost import _throttled_cost_api_call
+    from src.services.response_cache import STALE_AS_OF_KEY, cache_key
+
+    cache = ResponseCache(cache_dir=str(tmp_path), enabled=True)
+    payload = {"type": "ActualCost", "timePeriod": {"from": "2026-01-01", "to": "2026-06-20"}}
+    fetch = AsyncMock(return_value={"properties": {"rows": [[1.0]]}})
+
+    async def call():
+        return await _throttled_cost_api_call("https://example.test/q", "t", payload, "sub", "query")
+
+    with patch("src.services.azure_cost.response_cache", cache), \
+         patch("src.services.azure_cost.fetch_azure_data", new=fetch):
+        first = asyncio.run(call())
+        second = asyncio.run(call())
+        assert fetch.await_count == 1
+        assert second == first
+
+        cache.put(cache_key("https://example.test/q", payload), first, ttl=0)
+        fetch.side_effect = RuntimeError("throttled")
+        stale = asyncio.run(call())
+
+    assert stale["properties"] == first["properties"]
+    assert stale[STALE_AS_OF_KEY]
+
+
+def test_cache_ttl_keeps_closed_periods_and_expires_recent_ones():
+    from datetime import datetime
+
+    from src.services.response_cache import ttl_for_request
+
+    today = datetime(2026, 6, 20)
+    closed = {"timePeriod": {"from": "2026-01-01", "to": "2026-05-31"}}
+    current = {"timePeriod": {"from": "2026-06-01", "to": "2026-06-20"}}
+
+    assert ttl_for_request("query", closed, today=today) is None
+    assert ttl_for_request("query", current, today=today) > 0
+    assert ttl_for_request("forecast", closed, today=today) > 0
+
+
+def test_open_period_entry_is_last_known_good_for_the_next_day(tmp_path):
+    from src.services.azure_cost import _throttled_cost_api_call
+    from src.services.response_cache import STALE_AS_OF_KEY, cache_key
+
+    cache = ResponseCache(cache_dir=str(tmp_path), enabled=True)
+    yesterday = {"type": "ActualCost", "timePeriod": {"from": "2026-06-01", "to": "2026-06-19"}}
+    today = {"type": "ActualCost", "timePeriod": {"from": "2026-06-01", "to": "2026-06-20"}}
+    fetch = AsyncMock(return_value={"properties": {"rows": [[1.0]]}})
+
+    async def call(payload):
+        return await _throttled_cost_api_call("https://example.test/q", "t", payload, "sub", "query")
+
+    with patch("src.services.azure_cost.response_cache", cache), \
+         patch("src.services.azure_cost.fetch_azure_data", new=fetch):
+        asyncio.run(call(yesterday))
+        fetch.side_effect = RuntimeError("throttled")
+        stale = asyncio.run(call(today))
+
+    assert cache_key("https://example.test/q", yesterday) == cache_key("https://example.test/q", today)
+    assert fetch.await_count == 2
+    assert stale["properties"] == {"rows": [[1.0]]}
+    assert stale[STALE_AS_OF_KEY]
+
+
+def test_prune_removes_entries_older_than_max_age(tmp_path):
+    import os
+    import time
+
+    cache = ResponseCache(cache_dir=str(tmp_path), enabled=True)
+    cache.put("old", {"value": 1}, ttl=None)
+    cache.put("new", {"value": 2}, ttl=None)
+    (tmp_path / "abandoned.tmp").write_bytes(b"")
+    (tmp_path / "planner_stats.json").write_text("{}")
+    long_ago = time.time() - 3600
+    for name in ("old.json.gz", "abandoned.tmp", "planner_stats.json"):
+        os.utime(tmp_path / name, (long_ago, long_ago))
+
+    assert cache.prune(max_age=60) == 2
+    assert sorted(os.listdir(tmp_path)) == ["new.json.gz", "planner_stats.json"]
+    assert cache.prune(max_age=0) == 0
+
+
+def test_cache_ttl_uses_the_replay_clock():
+    from datetime import datetime
+
+    from src.services.response_cache import ttl_for_request
+    from src.utils import clock
+
+    payload = {"timePeriod": {"from": "2026-05-01", "to": "2026-05-31"}}
+    clock.freeze(datetime(2026, 6, 1))
+    try:
+        assert ttl_for_request("query", payload) > 0
+    finally:
+        clock.unfreeze()
@@ -0,0 +1,56 @@
+import asyncio
+from unittest.mock import patch
+
+
+def test_subscriptions_missing_the_run_budget_become_unavailable_entries():
+    from src.main import process_subscriptions
+    from src.services.run_budget import RunBudget
+
+    async def fake_process(sub_id, token):
+        await asyncio.sleep(5 if sub_id == "sub-slow" else 0)
+        if sub_id == "sub-broken":
+            return None
+        return {"subscription_name": sub_id, "data_status": {"state": "fresh", "as_of": None}}
+
+    async def run():
+        budget = RunBudget(deadline_sec=10, subscription_timeout_sec=0.05)
+        return await process_subscriptions(
+            ["sub-a", "sub-slow", "sub-broken"], "token", concurrency=3, budget=budget, partial=True
+        )
+
+    with patch("src.main.process_subscription", side_effect=fake_process), \
+         patch("src.main.cached_subscription_name", side_effect=lambda sub_id: f"Name {sub_id}"):
+        results = asyncio.run(run())
+
+    assert [entry["subscription_name"] for entry in results] == ["sub-a", "Name sub-slow", "Name sub-broken"]
+    assert [entry["data_status"]["state"] for entry in results] == ["fresh", "unavailable", "unavailable"]
+    assert results[1]["data_status"]["reason"] == "deadline"
+    assert results[2]["data_status"]["reason"] == "error"
+
+
+def test_subscription_name_listing_is_bounded_by_the_run_budget():
+    from src.main import _subscription_names
+    from src.services.run_budget import RunBudget
+
+    async def slow_listing(subscription_ids, token):
+        await asyncio.sleep(5)
+
+    async def run():
+        return await _subscription_names("token", ["sub-a"], RunBudget(deadline_sec=0.05))
+
+    with patch("src.main.get_subscription_names", side_effect=slow_listing), \
+         patch("src.main.cached_subscription_name", side_effect=lambda sub_id: f"Name {sub_id}"):
+        names = asyncio.run(asyncio.wait_for(run(), 2))
+
+    assert names == {"sub-a": "Name sub-a"}
+
+
+def test_parse_deadline_accepts_seconds_and_wall_clock_time():
+    from datetime import datetime
+
+    from src.services.run_budget import parse_deadline
+
+    now = datetime(2026, 6, 18, 6, 30)
+    assert parse_deadline("900", now=now) == 900
+    assert parse_deadline("07:45", now=now) == 75 * 60
+    assert parse_deadline("06:00", now=now) == 23.5 * 3600
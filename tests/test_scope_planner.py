@@ -0,0 +1,112 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.services.rate_limiter import AdaptiveRateLimiter
+from src.services.scope_planner import ScopePlanner, ScopeRunStats
+
+
+@pytest.fixture(autouse=True)
+def planner_limits():
+    limiter = AdaptiveRateLimiter(initial_rate=10, max_rate=10)
+    with patch("src.services.scope_planner.rate_limiter", limiter), \
+         patch("src.services.scope_planner.COST_API_MAX_CONCURRENT", 4), \
+         patch("src.services.scope_planner.COST_SCOPE_FILTER_BATCH_SIZE", 50):
+        yield
+
+
+def _planner(stats, management_group_id="mg-root"):
+    return ScopePlanner(stats, management_group_id=management_group_id, queries_per_scope=3)
+
+
+def test_planner_prefers_management_group_for_many_subscriptions(tmp_path):
+    subscriptions = [f"sub-{index}" for index in range(20)]
+
+    planner = _planner(ScopeRunStats(str(tmp_path / "stats.json")))
+    plan = planner.plan(subscriptions)
+
+    assert plan.name == "management-group"
+    assert plan.management_group == subscriptions
+    assert plan.estimate.requests < planner.estimate_per_subscription(subscriptions).requests
+
+
+def test_planner_without_management_group_fetches_per_subscription(tmp_path):
+    plan = _planner(ScopeRunStats(str(tmp_path / "stats.json")), management_group_id=None).plan(["sub-a"])
+
+    assert plan.name == "per-subscription"
+    assert plan.per_subscription == ["sub-a"]
+
+
+def test_planner_mixes_strategies_for_outliers_and_subscriptions_outside_the_group(tmp_path):
+    path = str(tmp_path / "stats.json")
+    stats = ScopeRunStats(path)
+    rows = {f"sub-{index}": 1000 for index in range(5)}
+    rows["sub-huge"] = 60000
+    stats.record_management_group("mg-root", rows, 30.0, missing=["sub-outside"])
+    stats.save()
+
+    plan = _planner(ScopeRunStats(path)).plan([*rows, "sub-outside"])
+
+    assert plan.name == "mixed"
+    assert plan.management_group == [f"sub-{index}" for index in range(5)]
+    assert plan.per_subscription == ["sub-outside", "sub-huge"]
+
+
+def test_management_group_members_without_spend_are_not_recorded_as_missing(tmp_path):
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    from src.services import azure_cost_scope
+
+    dates = {
+        "today": "2026-06-20",
+        "yesterday": "2026-06-18",
+        "month_starts_on": "2026-06-01",
+        "month_ends_on": "2026-06-30",
+        "year_starts_on": "2026-01-01",
+        "year_ends_on": "2026-12-31",
+    }
+    page = {
+        "properties": {
+            "columns": [{"name": name} for name in ("Cost", "UsageDate", "SubscriptionId", "ServiceName", "Currency")],
+            "rows": [[1.0, 20260618, "sub-spend", "Storage", "USD"]],
+        }
+    }
+
+    async def pages(*args, **kwargs):
+        yield page
+
+    stats = ScopeRunStats(str(tmp_path / "stats.json"))
+    subscriptions = ["sub-spend", "sub-idle", "sub-outside"]
+
+    def run(members):
+        with patch.object(azure_cost_scope, "MANAGEMENT_GROUP_ID", "mg-root"), \
+             patch.object(azure_cost_scope, "scope_run_stats", stats), \
+             patch.object(azure_cost_scope, "get_forecast_month_date", new=AsyncMock(return_value=dates)), \
+             patch.object(azure_cost_scope, "_iter_scope_actual_cost_data", side_effect=pages), \
+             patch.object(azure_cost_scope, "_iter_scope_cost_data", side_effect=pages), \
+             patch.object(azure_cost_scope, "get_subscription_names", new=AsyncMock(return_value={s: s for s in subscriptions})), \
+             patch.object(azure_cost_scope, "get_management_group_subscription_ids", new=AsyncMock(return_value=members)):
+            asyncio.run(azure_cost_scope.get_management_group_report_entries("token", subscriptions))
+        return stats.missing_from_management_group("mg-root")
+
+    assert run({"sub-spend", "sub-idle"}) == {"sub-outside"}
+    # Without a membership listing no subscription is pinned to per-subscription queries.
+    assert run(None) == set()
+
+
+def test_queries_per_scope_uses_the_report_dates():
+    import asyncio
+    from datetime import datetime
+    from unittest.mock import AsyncMock
+
+    from src.services.azure_cost import plan_actual_cost_queries
+    from src.services.scope_planner import _queries_per_scope
+    from src.utils import utils
+
+    today = datetime(2026, 6, 20, 8, 0)
+    with patch.object(utils.clock, "now", return_value=today), \
+         patch.object(utils, "get_billing_period", new=AsyncMock(return_value=(None, None))):
+        report_dates = asyncio.run(utils.get_forecast_month_date("sub-a"))
+
+    assert _queries_per_scope(today) == len(plan_actual_cost_queries(report_dates)) + 1